@@ -0,0 +1,117 @@
+"""Admission control for the engine-backed endpoints.
+
+Two independent checks run before an expensive request is handled:
+
+* ``TokenBucketLimiter`` keeps a token bucket per client in a bounded LRU
+  dict and rejects clients that exceed their rate (HTTP 429).
+* ``AdmissionQueue`` allows ``max_concurrent`` requests to run and at most
+  ``max_queue`` more to wait, in FIFO order, for up to ``max_wait`` seconds.
+  Requests that find the queue full or wait too long are shed (HTTP 503).
+
+Both report a ``Retry-After`` estimate. Requests that skip these checks,
+such as health and static data, never wait behind engine work. That holds as
+long as ``max_concurrent + max_queue`` is below the worker's thread count.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class TokenBucketLimiter:
+    """Per-client token buckets refilled at ``rate`` tokens/second up to ``burst``"""
+
+    def __init__(self, rate, burst, max_clients=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        # client -> (tokens, last refill time), least recently seen first
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, client, cost=1):
+        """Take ``cost`` tokens; returns 0 if allowed, else seconds until it would be"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= cost:
+                tokens -= cost
+                wait = 0.0
+            else:
+                wait = (cost - tokens) / self.rate
+            self._buckets[client] = (tokens, now)
+            self._buckets.move_to_end(client)
+            # Forget the clients seen least recently; they come back with a full bucket
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def clients(self):
+        """Number of clients currently tracked"""
+        with self._lock:
+            return len(self._buckets)
+
+
+class AdmissionQueue:
+    """Concurrency limit with a bounded FIFO queue and a maximum queue wait"""
+
+    def __init__(self, max_concurrent, max_queue, max_wait):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.active = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+        # Moving average of how long an admitted request holds its slot
+        self._service_time = 0.1
+
+    def acquire(self):
+        """Take a slot, waiting up to max_wait; returns None or the reason for rejection"""
+        with self._lock:
+            if self.active < self.max_concurrent and not self._waiters:
+                self.active += 1
+                return None
+            if len(self._waiters) >= self.max_queue:
+                return "queue_full"
+            waiter = threading.Event()
+            self._waiters.append(waiter)
+
+        if waiter.wait(self.max_wait):
+            return None
+        with self._lock:
+            # The slot may have been handed over just as the wait timed out
+            if waiter.is_set():
+                return None
+            self._waiters.remove(waiter)
+        return "queue_timeout"
+
+    def release(self, elapsed=None):
+        """Give the slot back, handing it straight to the oldest waiter if any"""
+        with self._lock:
+            if elapsed is not None:
+                self._service_time += 0.1 * (elapsed - self._service_time)
+            if self._waiters:
+                self._waiters.popleft().set()
+            else:
+                self.active -= 1
+
+    def retry_after(self):
+        """Whole seconds a rejected client should wait before retrying"""
+        with self._lock:
+            backlog = len(self._waiters) + 1
+            seconds = self._service_time * backlog / max(1, self.max_concurrent)
+        return max(1, math.ceil(seconds))
+
+    def stats(self):
+        """Snapshot of the queue state"""
+        with self._lock:
+            return {
+                "active": self.active,
+                "queued": len(self._waiters),
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "max_wait": self.max_wait,
+                "service_time": self._service_time,
+            }
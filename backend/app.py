@@ -1,85 +1,328 @@
-from flask import Flask, request, jsonify
+from startup import IMPORT_STARTED
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
-from astrology_engine import AstrologyEngine
-from datetime import datetime
+from werkzeug.middleware.proxy_fix import ProxyFix
+from admission import AdmissionQueue, TokenBucketLimiter
+from chart_cache import clone
+from metrics import create_registry
+from prediction_store import create_prediction_store
+from predictions import (
+    astro_engine, build_prediction, compute_positions, engine_build_seconds,
+    get_personalized_advice, parse_prediction_input, prediction_key, time_stages
+)
+from response_templates import ResponseTemplate, Slot, value_slot
+from singleflight import SingleFlight
+from synastry import ELEMENT_ORDER, SynastryGroup
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
 import pytz
+import hashlib
+import numpy as np
+import json
+import math
+import multiprocessing
 import os
+import threading
+import time
+
+# Cold-start cost in seconds, reported by /api/health
+# (the engine is built while importing predictions, so it is split out)
+startup_timings = {
+    "imports": time.perf_counter() - IMPORT_STARTED - engine_build_seconds,
+    "engine": engine_build_seconds,
+}
+startup_pid = os.getpid()
 
 app = Flask(__name__)
 CORS(app)
 
-# Initialize astrology engine
-astro_engine = AstrologyEngine()
+# Behind N reverse proxies, take the client address from X-Forwarded-For
+trusted_proxies = int(os.getenv('TRUSTED_PROXIES', 0))
+if trusted_proxies > 0:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=trusted_proxies)
+
+# Per-endpoint, per-stage and per-engine-function latency metrics
+metrics = create_registry()
+metrics.instrument(astro_engine, [
+    'generate_birth_chart_analysis',
+    '_compute_planetary_positions',
+    'generate_life_prediction',
+])
+time_stages(metrics.stage)
+
+# Coalesce bursts of identical /api/predict requests into one computation
+prediction_flights = SingleFlight() if os.getenv('PREDICTION_SINGLE_FLIGHT', 'True') == 'True' else None
+
+# Full /api/predict responses are spliced into pre-encoded templates, one per
+# (sun sign, life phase); sample ages fall well inside each phase
+PREDICTION_TEMPLATES_ENABLED = os.getenv('PREDICTION_TEMPLATES', 'True') == 'True'
+PREDICTION_TEMPLATE_AGES = (10, 21, 35, 57, 75)
+PREDICTION_TEMPLATE_CHECK_AGES = (15, 23, 45, 60, 90)
+
+# Each process runs a sample prediction before /api/health reports it ready;
+# under gunicorn's preload_app that happens again in every forked worker
+WARM_UP = os.getenv('WARM_UP', 'True') == 'True'
+WARM_UP_INPUT = {
+    "name": "Warm Up",
+    "birth_date": "1990-06-15",
+    "birth_time": "12:00",
+    "latitude": 28.6139,
+    "longitude": 77.209,
+    "gender": "Other",
+}
+warmed_pid = None
+
+# Store predictions in SQLite shared by all workers, with a bounded hot cache
+retention_days = os.getenv('PREDICTION_RETENTION_DAYS')
+prediction_store = create_prediction_store(
+    os.getenv('PREDICTION_STORE', 'sqlite'),
+    path=os.getenv('PREDICTION_DB_PATH', 'predictions.db'),
+    cache_size=int(os.getenv('PREDICTION_CACHE_SIZE', 1024)),
+    cache_ttl=float(os.getenv('PREDICTION_CACHE_TTL', 300)),
+    retention=float(retention_days) * 86400 if retention_days else None
+)
+
+# Batch predictions are fanned out across a process pool so they scale with cores
+BATCH_MAX_RECORDS = int(os.getenv('BATCH_MAX_RECORDS', 500))
+# Every server worker starts its own pool, so split the cores between them
+BATCH_WORKERS = int(os.getenv('BATCH_WORKERS') or
+                    max(1, (os.cpu_count() or 1) // int(os.getenv('WEB_CONCURRENCY', 1))))
+BATCH_TIMEOUT = float(os.getenv('BATCH_TIMEOUT', 60))
+# Pool processes start clean instead of as forks of this threaded process,
+# which could inherit locks held by other request threads mid-update
+BATCH_MP_CONTEXT = multiprocessing.get_context(
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+)
+_batch_executor = None
+_batch_executor_lock = threading.Lock()
+
+# Limits on the work a single transit timeline request may do
+TRANSIT_MAX_STEPS = int(os.getenv('TRANSIT_MAX_STEPS', 200000))
+TRANSIT_MAX_SECONDS = float(os.getenv('TRANSIT_MAX_SECONDS', 60))
+
+# Group sizes accepted by /api/synastry; the full matrix grows with N squared
+SYNASTRY_MAX_RECORDS = int(os.getenv('SYNASTRY_MAX_RECORDS', 5000))
+SYNASTRY_MAX_MATRIX_RECORDS = int(os.getenv('SYNASTRY_MAX_MATRIX_RECORDS', 1000))
+
+# Admission control for the engine-backed endpoints; health and static data
+# skip it. Keep ADMISSION_MAX_CONCURRENT + ADMISSION_MAX_QUEUE below the
+# server's threads per worker so those always find a free thread.
+ADMISSION_ENDPOINTS = frozenset(['get_prediction', 'get_batch_prediction', 'get_synastry', 'get_transits'])
+admission_max_concurrent = int(os.getenv('ADMISSION_MAX_CONCURRENT', 2))
+admission_queue = AdmissionQueue(
+    max_concurrent=admission_max_concurrent,
+    max_queue=int(os.getenv('ADMISSION_MAX_QUEUE', 4)),
+    max_wait=float(os.getenv('ADMISSION_MAX_WAIT', 2.0))
+) if admission_max_concurrent > 0 else None
+# Off by default: behind a proxy every client shares the proxy's address unless
+# TRUSTED_PROXIES is set to match the deployment
+rate_limit = float(os.getenv('RATE_LIMIT_PER_SECOND', 0))
+rate_limiter = TokenBucketLimiter(
+    rate=rate_limit,
+    burst=float(os.getenv('RATE_LIMIT_BURST', 20)),
+    max_clients=int(os.getenv('RATE_LIMIT_MAX_CLIENTS', 10000))
+) if rate_limit > 0 else None
+
+@app.before_request
+def start_request_metrics():
+    g.metrics_endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    g.metrics_started = time.perf_counter()
+    metrics.add('astro_http_requests_in_flight', (('endpoint', g.metrics_endpoint),), 1)
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = g.get('metrics_endpoint')
+    if endpoint is not None:
+        metrics.observe('astro_http_request_duration_seconds', (('endpoint', endpoint),),
+                        time.perf_counter() - g.metrics_started)
+        status = str(response.status_code)
+        metrics.inc('astro_http_requests_total', (('endpoint', endpoint), ('status', status)))
+        if response.status_code >= 400:
+            metrics.inc('astro_http_errors_total', (('endpoint', endpoint), ('status', status)))
+    return response
+
+@app.before_request
+def admit_request():
+    """Shed engine-backed requests that are over their rate or would queue too long"""
+    if request.endpoint not in ADMISSION_ENDPOINTS:
+        return None
+    
+    if rate_limiter is not None:
+        wait = rate_limiter.check(request.remote_addr or 'unknown')
+        if wait > 0:
+            metrics.inc('astro_admission_rejected_total', (('reason', 'rate_limited'),))
+            return reject_request(429, "Rate limit exceeded", wait)
+    
+    if admission_queue is not None:
+        began = time.perf_counter()
+        reason = admission_queue.acquire()
+        metrics.observe('astro_admission_wait_seconds', (), time.perf_counter() - began)
+        if reason is not None:
+            metrics.inc('astro_admission_rejected_total', (('reason', reason),))
+            return reject_request(503, "Server busy, please retry later", admission_queue.retry_after())
+        g.admission_started = time.perf_counter()
+    return None
+
+@app.after_request
+def release_admission_slot(response):
+    started = g.pop('admission_started', None)
+    if started is None:
+        return response
+    if response.is_streamed:
+        # Streamed responses keep computing after the view returns, so hold
+        # the slot until the server closes the response
+        response.call_on_close(lambda: admission_queue.release(time.perf_counter() - started))
+    else:
+        admission_queue.release(time.perf_counter() - started)
+    return response
+
+@app.teardown_request
+def release_admission(error):
+    # Only reached with a slot still held when the request failed before after_request
+    if g.pop('admission_started', None) is not None:
+        admission_queue.release()
 
-# Store predictions (in production, use a database)
-predictions_storage = {}
+@app.teardown_request
+def finish_request_metrics(error):
+    endpoint = g.pop('metrics_endpoint', None)
+    if endpoint is None:
+        return
+    metrics.add('astro_http_requests_in_flight', (('endpoint', endpoint),), -1)
+    if error is not None:
+        metrics.inc('astro_http_errors_total', (('endpoint', endpoint), ('status', 'exception')))
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus metrics, aggregated across workers when METRICS_DIR is set"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
-    return jsonify({"status": "healthy", "service": "Astrology API"}), 200
+    """Health check endpoint; 503 until this process has warmed up"""
+    ready = not WARM_UP or warmed_pid == os.getpid()
+    return jsonify({
+        "status": "healthy" if ready else "starting",
+        "service": "Astrology API",
+        "ready": ready,
+        "startup": {
+            "pid": os.getpid(),
+            "preloaded": startup_pid != os.getpid(),
+            "timings": {stage: round(seconds, 4) for stage, seconds in startup_timings.items()},
+        },
+    }), 200 if ready else 503
 
 @app.route('/api/predict', methods=['POST'])
 def get_prediction():
     """Main prediction endpoint"""
     try:
-        data = request.json
+        with metrics.stage('parse'):
+            data = request.json
         
-        # Validate input
-        required_fields = ['name', 'birth_date', 'birth_time', 'latitude', 'longitude', 'gender']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({"error": f"Missing field: {field}"}), 400
+        with metrics.stage('validate'):
+            params, error = parse_prediction_input(data, default_fields=request.args.get('fields'))
+        if error:
+            return jsonify({"error": error}), 400
         
-        name = data.get('name', '').strip()
-        birth_date_str = data.get('birth_date')  # Format: YYYY-MM-DD
-        birth_time_str = data.get('birth_time')  # Format: HH:MM
-        latitude = float(data.get('latitude'))
-        longitude = float(data.get('longitude'))
-        gender = data.get('gender', '').strip()
+        if params['fields'] is None and PREDICTION_TEMPLATES and compact_json():
+            body = render_prediction(params)
+            if body is not None:
+                return json_bytes_response(body), 200
         
-        # Validate input data
-        if not name or len(name) < 2:
-            return jsonify({"error": "Name must be at least 2 characters"}), 400
+        if prediction_flights is None:
+            result = build_prediction(params)
+        else:
+            # Identical concurrent requests share one computation
+            result, shared = prediction_flights.do(prediction_key(params), build_prediction, params)
+            if shared:
+                metrics.inc('astro_prediction_coalesced_total')
+            result = clone(result)
         
-        if gender not in ['Male', 'Female', 'Other']:
-            return jsonify({"error": "Gender must be Male, Female, or Other"}), 400
+        # Store prediction (optional, for tracking)
+        with metrics.stage('storage'):
+            prediction_id = f"{params['name']}_{datetime.now().timestamp()}"
+            result['prediction_id'] = prediction_id
+            prediction_store.put(prediction_id, result)
         
-        # Parse datetime
-        try:
-            birth_datetime = datetime.strptime(f"{birth_date_str} {birth_time_str}", "%Y-%m-%d %H:%M")
-        except ValueError:
-            return jsonify({"error": "Invalid date or time format. Use YYYY-MM-DD and HH:MM"}), 400
+        with metrics.stage('serialize'):
+            response = jsonify(result)
+        return response, 200
+    
+    except ValueError as e:
+        return jsonify({"error": f"Invalid input: {str(e)}"}), 400
+    except Exception as e:
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+@app.route('/api/predict/batch', methods=['POST'])
+def get_batch_prediction():
+    """Batch prediction endpoint, computing charts across a worker pool"""
+    try:
+        data = request.json
+        records = data.get('records') if isinstance(data, dict) else data
         
-        # Validate coordinates
-        if latitude < -90 or latitude > 90 or longitude < -180 or longitude > 180:
-            return jsonify({"error": "Invalid latitude or longitude"}), 400
+        if not isinstance(records, list) or not records:
+            return jsonify({"error": "Request must contain a non-empty 'records' array"}), 400
         
-        # Generate birth chart analysis
-        birth_chart = astro_engine.generate_birth_chart_analysis(
-            name, birth_datetime, latitude, longitude, gender
-        )
+        if len(records) > BATCH_MAX_RECORDS:
+            return jsonify({"error": f"Batch too large: at most {BATCH_MAX_RECORDS} records allowed"}), 400
         
-        # Generate life predictions
-        predictions = astro_engine.generate_life_prediction(birth_datetime, gender)
+        # Validate every record up front so only valid ones reach the pool
+        results = [None] * len(records)
+        pending = []
+        for index, record in enumerate(records):
+            try:
+                params, error = parse_prediction_input(record)
+            except Exception as e:
+                params, error = None, f"Server error: {str(e)}"
+            if error:
+                results[index] = {"index": index, "success": False, "error": error}
+            else:
+                pending.append((index, params))
         
-        # Combine results
-        result = {
-            "success": True,
-            "birth_chart": birth_chart,
-            "predictions": predictions,
-            "advice": get_personalized_advice(birth_chart, predictions, gender)
-        }
+        if pending:
+            executor = get_batch_executor()
+            try:
+                futures = [(index, params, executor.submit(build_prediction, params))
+                           for index, params in pending]
+            except BrokenProcessPool:
+                # The pool broke under an earlier batch; retry on a fresh one
+                reset_batch_executor(executor)
+                executor = get_batch_executor()
+                futures = [(index, params, executor.submit(build_prediction, params))
+                           for index, params in pending]
+            deadline = time.monotonic() + BATCH_TIMEOUT
+            
+            for index, params, future in futures:
+                try:
+                    result = future.result(timeout=max(0, deadline - time.monotonic()))
+                except FutureTimeoutError:
+                    future.cancel()
+                    results[index] = {"index": index, "success": False, "error": "Timed out"}
+                    continue
+                except BrokenProcessPool as e:
+                    reset_batch_executor(executor)
+                    results[index] = {"index": index, "success": False, "error": f"Server error: {str(e)}"}
+                    continue
+                except Exception as e:
+                    results[index] = {"index": index, "success": False, "error": f"Server error: {str(e)}"}
+                    continue
+                
+                prediction_id = f"{params['name']}_{datetime.now().timestamp()}"
+                result['prediction_id'] = prediction_id
+                prediction_store.put(prediction_id, result)
+                result = dict(result, index=index)
+                results[index] = result
         
-        # Store prediction (optional, for tracking)
-        prediction_id = f"{name}_{datetime.now().timestamp()}"
-        predictions_storage[prediction_id] = result
-        result['prediction_id'] = prediction_id
+        succeeded = sum(1 for result in results if result['success'])
         
-        return jsonify(result), 200
+        return jsonify({
+            "success": True,
+            "total": len(results),
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "results": results
+        }), 200
     
-    except ValueError as e:
-        return jsonify({"error": f"Invalid input: {str(e)}"}), 400
     except Exception as e:
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
@@ -95,20 +338,78 @@ def check_compatibility():
         if not sign1 or not sign2:
             return jsonify({"error": "Both signs required"}), 400
         
-        # Get compatibility from zodiac characteristics
-        engine = AstrologyEngine()
-        characteristics = engine._get_sign_characteristics(sign1)
-        compatibility_list = characteristics.get('compatibility', [])
+        body = COMPATIBILITY_BODIES.get((sign1, sign2))
+        if body is not None:
+            return json_bytes_response(body)
         
-        compatibility_score = 90 if sign2 in compatibility_list else 60
+        return jsonify(compatibility_result(sign1, sign2)), 200
+    
+    except Exception as e:
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+@app.route('/api/synastry', methods=['POST'])
+def get_synastry():
+    """Pairwise compatibility for a group: the full score matrix or each person's top-k matches"""
+    try:
+        data = request.json
+        records = data.get('records') if isinstance(data, dict) else None
         
-        return jsonify({
-            "sign1": sign1,
-            "sign2": sign2,
-            "compatibility_score": compatibility_score,
-            "compatible": sign2 in compatibility_list,
-            "description": f"{sign1} and {sign2} have a {'strong' if sign2 in compatibility_list else 'moderate'} connection."
-        }), 200
+        if not isinstance(records, list) or len(records) < 2:
+            return jsonify({"error": "Request must contain a 'records' array with at least 2 people"}), 400
+        
+        top_k = data.get('top_k')
+        if top_k is not None:
+            if isinstance(top_k, bool) or not isinstance(top_k, int) or top_k < 1:
+                return jsonify({"error": "top_k must be a positive integer"}), 400
+            max_records = SYNASTRY_MAX_RECORDS
+        else:
+            max_records = SYNASTRY_MAX_MATRIX_RECORDS
+        
+        if len(records) > max_records:
+            mode = "top_k" if top_k is not None else "matrix"
+            return jsonify({"error": f"Group too large: at most {max_records} records allowed in {mode} mode"}), 400
+        
+        people = []
+        params_list = []
+        for index, record in enumerate(records):
+            params, error = parse_prediction_input(record)
+            if error:
+                return jsonify({"error": f"Record {index}: {error}"}), 400
+            sun_sign = astro_engine.get_sun_sign(params['birth_datetime'])['name']
+            params_list.append(params)
+            people.append({
+                "index": index,
+                "name": params['name'],
+                "sun_sign": sun_sign,
+                "element": astro_engine.ELEMENTS[sun_sign],
+            })
+        
+        with metrics.stage('chart'):
+            positions = synastry_positions(params_list)
+        
+        with metrics.stage('synastry'):
+            group = SynastryGroup(
+                [astro_engine.SIGN_INDEX[person['sun_sign']] for person in people],
+                [ELEMENT_ORDER.index(person['element']) for person in people],
+                positions,
+                astro_engine.COMPATIBILITY_MATRIX,
+                astro_engine.PLANET_NAMES
+            )
+            result = {"success": True, "count": len(people), "people": people}
+            
+            if top_k is None:
+                matrix = np.round(group.matrix().astype(np.float64), 1).tolist()
+                for index, row in enumerate(matrix):
+                    row[index] = None
+                result['matrix'] = matrix
+            else:
+                indexes, scores = group.top_matches(top_k)
+                scores = np.round(scores.astype(np.float64), 1).tolist()
+                for person, match_indexes, match_scores in zip(people, indexes.tolist(), scores):
+                    person['matches'] = [{"index": match, "score": score}
+                                         for match, score in zip(match_indexes, match_scores)]
+        
+        return jsonify(result), 200
     
     except Exception as e:
         return jsonify({"error": f"Server error: {str(e)}"}), 500
@@ -117,45 +418,338 @@ def check_compatibility():
 def get_zodiac_signs():
     """Get all zodiac signs"""
     try:
-        signs = []
-        for sign in astro_engine.ZODIAC_SIGNS:
-            signs.append({
-                "name": sign["name"],
-                "symbol": sign["symbol"],
-                "element": astro_engine.ELEMENTS[sign["name"]],
-                "dates": f"{sign['start'][0]}/{sign['start'][1]} - {sign['end'][0]}/{sign['end'][1]}"
-            })
-        return jsonify({"zodiac_signs": signs}), 200
+        return json_bytes_response(ZODIAC_SIGNS_BODY, etag=ZODIAC_SIGNS_ETAG)
     except Exception as e:
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
+@app.route('/api/transits', methods=['GET'])
+def get_transits():
+    """Stream planetary positions over a time range as NDJSON"""
+    try:
+        args = request.args
+        
+        for field in ['start', 'end', 'step', 'latitude', 'longitude']:
+            if field not in args:
+                return jsonify({"error": f"Missing parameter: {field}"}), 400
+        
+        try:
+            start = parse_utc_datetime(args['start'])
+            end = parse_utc_datetime(args['end'])
+        except ValueError:
+            return jsonify({"error": "Invalid start or end. Use ISO 8601, e.g. 2024-01-01T00:00"}), 400
+        
+        step = parse_step(args['step'])
+        if step is None:
+            return jsonify({"error": "Invalid step. Use a count and unit, e.g. 30m, 1h or 1d"}), 400
+        
+        latitude = float(args['latitude'])
+        longitude = float(args['longitude'])
+        # NaN passes the range check and would stream invalid JSON
+        if not (math.isfinite(latitude) and math.isfinite(longitude)):
+            return jsonify({"error": "Invalid latitude or longitude"}), 400
+        if latitude < -90 or latitude > 90 or longitude < -180 or longitude > 180:
+            return jsonify({"error": "Invalid latitude or longitude"}), 400
+        
+        if end < start:
+            return jsonify({"error": "End must not be before start"}), 400
+        
+        # Cap the work a single request may ask for, both in rows and wall time
+        max_steps = min(int(args.get('max_steps', TRANSIT_MAX_STEPS)), TRANSIT_MAX_STEPS)
+        if max_steps < 1:
+            return jsonify({"error": "max_steps must be at least 1"}), 400
+        steps = int((end - start) / step) + 1
+        if steps > max_steps:
+            return jsonify({"error": f"Range has {steps} steps; at most {max_steps} allowed"}), 400
+        
+        rows = astro_engine.iter_planetary_positions(start, end, step, latitude, longitude)
+        return Response(stream_transit_rows(rows, TRANSIT_MAX_SECONDS), mimetype='application/x-ndjson')
+    
+    except ValueError as e:
+        return jsonify({"error": f"Invalid input: {str(e)}"}), 400
+    except Exception as e:
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Chart cache counters for this worker process"""
+    if astro_engine.chart_cache is None:
+        return jsonify({"enabled": False}), 200
+    return jsonify(dict(astro_engine.chart_cache.stats(), enabled=True)), 200
+
 @app.route('/api/predictions/<prediction_id>', methods=['GET'])
 def get_prediction_by_id(prediction_id):
     """Retrieve a stored prediction"""
     try:
-        if prediction_id in predictions_storage:
-            return jsonify(predictions_storage[prediction_id]), 200
+        result = prediction_store.get(prediction_id)
+        if result is not None:
+            return jsonify(result), 200
         else:
             return jsonify({"error": "Prediction not found"}), 404
     except Exception as e:
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
-def get_personalized_advice(birth_chart, predictions, gender):
-    """Generate personalized advice based on analysis"""
-    sun_sign = birth_chart['sun_sign']['name']
-    current_phase = predictions['current_life_phase']
-    life_path = birth_chart['life_path_number']
-    
-    advice = {
-        "career": f"As a {sun_sign}, you excel in roles that allow you to express your natural strengths.",
-        "relationships": f"Your {sun_sign} nature brings unique qualities to relationships. Focus on understanding your partner's needs.",
-        "health": "Maintain physical activity, manage stress through meditation or yoga, and ensure adequate sleep.",
-        "finances": f"Your life path number {life_path} suggests success through disciplined planning and strategic investments.",
-        "spiritual": "Explore meditation, journaling, or spiritual practices that resonate with your inner self.",
-        "general": f"You are in your {current_phase} phase. Focus on meaningful growth and positive relationships."
+def parse_utc_datetime(value):
+    """Parse an ISO 8601 date or datetime into a naive UTC datetime"""
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(pytz.utc).replace(tzinfo=None)
+    return moment
+
+def parse_step(value):
+    """Parse a step such as '30m', '6h' or '1d' into a timedelta, or None if invalid"""
+    units = {'m': 'minutes', 'h': 'hours', 'd': 'days'}
+    count, unit = value[:-1], value[-1:].lower()
+    if unit not in units or not count.isdigit() or int(count) <= 0:
+        return None
+    try:
+        return timedelta(**{units[unit]: int(count)})
+    except OverflowError:
+        return None
+
+def stream_transit_rows(rows, max_seconds, rows_per_chunk=100):
+    """Encode (datetime, positions) rows as NDJSON within a time budget"""
+    deadline = time.monotonic() + max_seconds
+    buffer = []
+    first = True
+    for moment, positions in rows:
+        if time.monotonic() > deadline:
+            # Tell the client where to resume instead of silently stopping
+            buffer.append(json.dumps({"truncated": True, "next": moment.isoformat()},
+                                     separators=(',', ':')) + "\n")
+            break
+        buffer.append(json.dumps({"time": moment.isoformat(), "positions": positions},
+                                 separators=(',', ':')) + "\n")
+        # Send the first row right away, then batch rows to keep writes efficient
+        if first or len(buffer) >= rows_per_chunk:
+            yield "".join(buffer)
+            buffer = []
+            first = False
+    if buffer:
+        yield "".join(buffer)
+
+def compatibility_result(sign1, sign2):
+    """Build the compatibility response for two sign names"""
+    compatible = astro_engine.is_compatible(sign1, sign2)
+    
+    return {
+        "sign1": sign1,
+        "sign2": sign2,
+        "compatibility_score": 90 if compatible else 60,
+        "compatible": compatible,
+        "description": f"{sign1} and {sign2} have a {'strong' if compatible else 'moderate'} connection."
     }
+
+def zodiac_signs_result():
+    """Build the list of all zodiac signs"""
+    signs = []
+    for sign in astro_engine.ZODIAC_SIGNS:
+        signs.append({
+            "name": sign["name"],
+            "symbol": sign["symbol"],
+            "element": astro_engine.ELEMENTS[sign["name"]],
+            "dates": f"{sign['start'][0]}/{sign['start'][1]} - {sign['end'][0]}/{sign['end'][1]}"
+        })
+    return {"zodiac_signs": signs}
+
+def reject_request(status, message, retry_after):
+    """Fast rejection carrying a Retry-After header in whole seconds"""
+    retry_after = max(1, math.ceil(retry_after))
+    response = jsonify({"error": message, "retry_after": retry_after})
+    response.headers['Retry-After'] = str(retry_after)
+    return response, status
+
+def json_bytes_response(body, etag=None):
+    """Serve pre-encoded JSON, answering If-None-Match with 304 when an ETag is given"""
+    response = app.response_class(body, mimetype=app.json.mimetype)
+    if etag is not None:
+        response.set_etag(etag)
+        response = response.make_conditional(request)
+    return response
+
+def prediction_values(params):
+    """(template key, slot values) of the full prediction for validated input"""
+    birth_datetime = params['birth_datetime']
+    latitude = params['latitude']
+    longitude = params['longitude']
+    
+    with metrics.stage('chart'):
+        values, utc_date = astro_engine.birth_chart_header(
+            params['name'], birth_datetime, latitude, longitude, params['gender'], timezone=params['timezone']
+        )
+        values['life_path_number'] = astro_engine.calculate_life_path_number(birth_datetime)
+        values['planetary_positions'] = encoded_positions(utc_date, latitude, longitude)
+        sun_sign = astro_engine.get_sun_sign(birth_datetime)['name']
+    
+    with metrics.stage('predictions'):
+        values['current_age'], current_phase = astro_engine.get_life_phase(birth_datetime)
+    
+    return (sun_sign, current_phase), values
+
+def render_prediction(params):
+    """Encoded full prediction from its template, or None when there is no template"""
+    if prediction_flights is None:
+        key, values = prediction_values(params)
+    else:
+        # Values are only read while rendering, so coalesced requests share them as is
+        (key, values), shared = prediction_flights.do(('template',) + prediction_key(params), prediction_values, params)
+        if shared:
+            metrics.inc('astro_prediction_coalesced_total')
+    
+    template = PREDICTION_TEMPLATES.get(key)
+    if template is None:
+        return None
+    
+    prediction_id = f"{params['name']}_{datetime.now().timestamp()}"
+    with metrics.stage('serialize'):
+        body = template.render(dict(values, prediction_id=prediction_id))
     
-    return advice
+    # Store prediction (optional, for tracking)
+    with metrics.stage('storage'):
+        prediction_store.put(prediction_id, body)
+    return body
+
+def encoded_positions(utc_date, latitude, longitude):
+    """Planetary positions as JSON bytes for the templates, cached alongside the charts"""
+    cache = astro_engine.chart_cache
+    if cache is None:
+        positions = astro_engine.get_planetary_positions(utc_date, latitude, longitude)
+        return PREDICTION_JSON.encode(positions).encode('utf-8')
+    
+    latitude, longitude = cache.quantize(latitude, longitude)
+    key = ("positions_json", utc_date, latitude, longitude)
+    encoded = cache.get(key)
+    if encoded is None:
+        positions = astro_engine._compute_planetary_positions(utc_date, latitude, longitude)
+        encoded = PREDICTION_JSON.encode(positions).encode('utf-8')
+        cache.set(key, encoded)
+    return encoded
+
+def compact_json():
+    """Whether jsonify currently writes compact JSON, as the prediction templates do"""
+    compact = app.json.compact
+    return not (compact is False or (compact is None and app.debug))
+
+def build_prediction_templates():
+    """Pre-encoded full predictions per (sun sign, life phase), checked against build_prediction"""
+    today = datetime.now()
+    templates = {}
+    for sign in astro_engine.ZODIAC_SIGNS:
+        month, day = sign['start']
+        for age in PREDICTION_TEMPLATE_AGES:
+            params, _ = parse_prediction_input({
+                "name": "Template",
+                "birth_date": f"{today.year - age - 1}-{month:02d}-{day:02d}",
+                "birth_time": "12:00",
+                "latitude": 0.0,
+                "longitude": 0.0,
+                "gender": "Other",
+            })
+            key, _ = prediction_values(params)
+            templates[key] = ResponseTemplate(jsonify(prediction_template(params)).get_data(), PREDICTION_JSON.encode)
+    
+    # A second sample per template, differing in every slot, must render
+    # byte for byte what jsonify produces for the regular path
+    for sign in astro_engine.ZODIAC_SIGNS:
+        month, day = sign['start']
+        for age in PREDICTION_TEMPLATE_CHECK_AGES:
+            birth_date = datetime(today.year - age - 1, month, day) + timedelta(days=5)
+            params, _ = parse_prediction_input({
+                "name": "Zoë Ångström-Łukasz",
+                "birth_date": birth_date.strftime("%Y-%m-%d"),
+                "birth_time": "23:45",
+                "latitude": 40.7128,
+                "longitude": -74.006,
+                "gender": "Female",
+            })
+            key, values = prediction_values(params)
+            template = templates.get(key)
+            expected = jsonify(dict(build_prediction(params), prediction_id="check_1.5")).get_data()
+            if template is None or template.render(dict(values, prediction_id="check_1.5")) != expected:
+                app.logger.warning("Prediction template %s does not match the regular response; "
+                                   "templates disabled", key)
+                return {}
+    return templates
+
+def prediction_template(params):
+    """Full prediction for sample input with every per-request value replaced by a slot"""
+    result = build_prediction(params)
+    result['prediction_id'] = value_slot('prediction_id')
+    
+    birth_chart = result['birth_chart']
+    for field in ('name', 'birth_date', 'gender', 'location', 'timezone', 'life_path_number', 'planetary_positions'):
+        birth_chart[field] = value_slot(field)
+    
+    # The age also appears inside the past and future texts
+    age = Slot('current_age')
+    predictions = result['predictions']
+    predictions['current_age'] = value_slot('current_age')
+    predictions['past_prediction'] = astro_engine._generate_past_prediction(age, params['gender'])
+    predictions['future_prediction'] = astro_engine._generate_future_prediction(age, params['gender'])
+    
+    advice_chart = dict(birth_chart, life_path_number=Slot('life_path_number'))
+    result['advice'] = get_personalized_advice(advice_chart, predictions, params['gender'])
+    return result
+
+def warm_up():
+    """Run the prediction paths once in this process so the first request is not a cold one"""
+    global warmed_pid
+    if not WARM_UP:
+        return
+    
+    began = time.perf_counter()
+    # The prediction store and batch pool are left alone: they belong to
+    # each worker, and this may run in a gunicorn master before it forks
+    with metrics.paused(), app.app_context():
+        params, _ = parse_prediction_input(WARM_UP_INPUT)
+        jsonify(build_prediction(params))
+        key, values = prediction_values(params)
+        template = PREDICTION_TEMPLATES.get(key)
+        if template is not None:
+            template.render(dict(values, prediction_id="warm_up"))
+        sun_sign = astro_engine.get_sun_sign(params['birth_datetime'])['name']
+        SynastryGroup(
+            [astro_engine.SIGN_INDEX[sun_sign]] * 2,
+            [ELEMENT_ORDER.index(astro_engine.ELEMENTS[sun_sign])] * 2,
+            compute_positions([params]) * 2,
+            astro_engine.COMPATIBILITY_MATRIX,
+            astro_engine.PLANET_NAMES
+        ).top_matches(1)
+    startup_timings['warm_up'] = time.perf_counter() - began
+    warmed_pid = os.getpid()
+
+def synastry_positions(params_list, chunk_size=250):
+    """Planetary positions for a group, spread across the batch pool when it is large"""
+    if len(params_list) <= chunk_size:
+        return compute_positions(params_list)
+    
+    chunks = [params_list[start:start + chunk_size] for start in range(0, len(params_list), chunk_size)]
+    executor = get_batch_executor()
+    try:
+        return [positions for chunk in executor.map(compute_positions, chunks, timeout=BATCH_TIMEOUT)
+                for positions in chunk]
+    except BrokenProcessPool:
+        reset_batch_executor(executor)
+        raise
+
+def get_batch_executor():
+    """Lazily create the process pool used for batch chart computation"""
+    global _batch_executor
+    with _batch_executor_lock:
+        if _batch_executor is None:
+            _batch_executor = ProcessPoolExecutor(max_workers=BATCH_WORKERS, mp_context=BATCH_MP_CONTEXT)
+        return _batch_executor
+
+def reset_batch_executor(executor):
+    """Drop a broken process pool so the next batch starts a fresh one"""
+    global _batch_executor
+    with _batch_executor_lock:
+        # Another request may already have replaced it with a working pool
+        if _batch_executor is not executor:
+            return
+        _batch_executor = None
+    executor.shutdown(wait=False)
 
 @app.errorhandler(404)
 def not_found(error):
@@ -165,6 +759,28 @@ def not_found(error):
 def internal_error(error):
     return jsonify({"error": "Internal server error"}), 500
 
+# Static responses are encoded once, exactly as jsonify would, and served as bytes
+responses_started = time.perf_counter()
+with app.app_context(), metrics.paused():
+    ZODIAC_SIGNS_BODY = jsonify(zodiac_signs_result()).get_data()
+    COMPATIBILITY_BODIES = {
+        (sign1["name"], sign2["name"]): jsonify(compatibility_result(sign1["name"], sign2["name"])).get_data()
+        for sign1 in astro_engine.ZODIAC_SIGNS
+        for sign2 in astro_engine.ZODIAC_SIGNS
+    }
+    # Template slots are encoded with the same settings as jsonify's compact output
+    PREDICTION_JSON = json.JSONEncoder(
+        separators=(",", ":"),
+        ensure_ascii=app.json.ensure_ascii,
+        sort_keys=app.json.sort_keys,
+        default=app.json.default
+    )
+    PREDICTION_TEMPLATES = build_prediction_templates() if PREDICTION_TEMPLATES_ENABLED else {}
+ZODIAC_SIGNS_ETAG = hashlib.sha1(ZODIAC_SIGNS_BODY).hexdigest()
+startup_timings['responses'] = time.perf_counter() - responses_started
+
+warm_up()
+
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 5000))
     app.run(debug=os.getenv('DEBUG', 'False') == 'True', host='0.0.0.0', port=port)
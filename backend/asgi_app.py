@@ -0,0 +1,218 @@
+"""Asynchronous serving mode for the Flask app.
+
+``app`` is an ASGI application exposing exactly the routes of ``app.py``.
+Cheap endpoints run inline on the event loop, while everything that may
+touch the engine or the disk runs in a bounded thread pool with a
+per-request timeout, so a spike of heavy chart requests cannot starve
+``/api/health`` or ``/api/zodiac-signs``. Run it with:
+
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5000 --workers 4
+"""
+
+import asyncio
+import io
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from app import app as flask_app
+
+# Endpoints answered from precomputed data in well under a millisecond
+CHEAP_PATHS = frozenset([
+    '/api/health',
+    '/api/zodiac-signs',
+    '/api/zodiac-compatibility',
+    '/api/cache/stats',
+])
+
+ENGINE_WORKERS = int(os.getenv('ASYNC_ENGINE_WORKERS', os.cpu_count() or 1))
+REQUEST_TIMEOUT = float(os.getenv('ASYNC_REQUEST_TIMEOUT', 30))
+# Requests waiting for or running in the engine pool before new ones are shed
+MAX_PENDING = int(os.getenv('ASYNC_MAX_PENDING', ENGINE_WORKERS * 4))
+
+# Engine threads are CPU-bound and hold the GIL; a shorter switch interval lets
+# the event loop thread get back in quickly to answer cheap requests
+sys.setswitchinterval(float(os.getenv('ASYNC_SWITCH_INTERVAL', 0.001)))
+
+
+class AsyncWSGIBridge:
+    """ASGI wrapper that runs a WSGI app inline or in a bounded executor"""
+
+    def __init__(self, wsgi_app, cheap_paths, max_workers, timeout, max_pending):
+        self.wsgi_app = wsgi_app
+        self.cheap_paths = cheap_paths
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.pending = 0
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='engine')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        body = await self._read_body(receive)
+        environ = build_environ(scope, body)
+
+        if scope['path'] in self.cheap_paths:
+            status, headers, chunks = self._call_wsgi(environ)
+            await self._send_response(send, status, headers, chunks)
+            return
+
+        # Shed load before it piles up behind the executor's unbounded queue
+        if self.pending >= self.max_pending:
+            await self._send_response(send, '503 Service Unavailable',
+                                      [('Content-Type', 'application/json'), ('Retry-After', '1')],
+                                      [json.dumps({"error": "Server busy, please retry later",
+                                                   "retry_after": 1}).encode()])
+            return
+
+        self.pending += 1
+        future = self.executor.submit(self._call_wsgi, environ)
+        try:
+            # The timeout covers queueing for a worker thread and producing the response
+            status, headers, chunks = await asyncio.wait_for(asyncio.wrap_future(future),
+                                                             timeout=self.timeout)
+        except asyncio.TimeoutError:
+            # A call already running can't be cancelled; close whatever it
+            # returns, as that releases resources such as admission slots
+            future.add_done_callback(close_abandoned_response)
+            await self._send_response(send, '504 Gateway Timeout', [('Content-Type', 'application/json')],
+                                      [json.dumps({"error": "Request timed out"}).encode()])
+            return
+        finally:
+            self.pending -= 1
+
+        if isinstance(chunks, list):
+            await self._send_response(send, status, headers, chunks)
+        else:
+            await self._stream_response(receive, send, status, headers, chunks)
+
+    def _call_wsgi(self, environ):
+        """Run the WSGI app up to its first body chunk"""
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = status
+            response['headers'] = headers
+
+        iterable = self.wsgi_app(environ, start_response)
+        # Buffered responses carry a Content-Length; only true streams are left lazy
+        if any(name.lower() == 'content-length' for name, _ in response['headers']):
+            try:
+                chunks = list(iterable)
+            finally:
+                if hasattr(iterable, 'close'):
+                    iterable.close()
+            return response['status'], response['headers'], chunks
+        return response['status'], response['headers'], iterable
+
+    async def _send_response(self, send, status, headers, chunks):
+        await self._send_start(send, status, headers)
+        await send({'type': 'http.response.body', 'body': b''.join(chunks)})
+
+    async def _stream_response(self, receive, send, status, headers, iterable):
+        """Pull a streamed body from the executor one chunk at a time, until the client leaves"""
+        loop = asyncio.get_running_loop()
+        iterator = iter(iterable)
+        done = object()
+        disconnected = asyncio.ensure_future(self._wait_for_disconnect(receive))
+        try:
+            await self._send_start(send, status, headers)
+            while True:
+                chunk = loop.run_in_executor(self.executor, next, iterator, done)
+                await asyncio.wait({chunk, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                # A running chunk can't be interrupted; let it finish so the
+                # iterable can be closed, then stop producing more
+                chunk = await chunk
+                if chunk is done or disconnected.done():
+                    break
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            if not disconnected.done():
+                await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            disconnected.cancel()
+            if hasattr(iterable, 'close'):
+                await loop.run_in_executor(self.executor, iterable.close)
+
+    async def _wait_for_disconnect(self, receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    async def _send_start(self, send, status, headers):
+        await send({
+            'type': 'http.response.start',
+            'status': int(status.split(' ', 1)[0]),
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                        for name, value in headers],
+        })
+
+    async def _read_body(self, receive):
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            chunks.append(message.get('body', b''))
+            more_body = message.get('more_body', False)
+        return b''.join(chunks)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def close_abandoned_response(future):
+    """Close the body of a response nobody will send"""
+    if future.cancelled() or future.exception() is not None:
+        return
+    chunks = future.result()[2]
+    if hasattr(chunks, 'close'):
+        chunks.close()
+
+
+def build_environ(scope, body):
+    """Translate an ASGI HTTP scope into a WSGI environ"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client')
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0] if client else '',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name == 'CONTENT_LENGTH':
+            environ['CONTENT_LENGTH'] = value
+        else:
+            key = f'HTTP_{name}'
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+app = AsyncWSGIBridge(flask_app, CHEAP_PATHS, ENGINE_WORKERS, REQUEST_TIMEOUT, MAX_PENDING)
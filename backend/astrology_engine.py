@@ -1,7 +1,52 @@
 import ephem
 import math
+import threading
+from calendar import monthrange
 from datetime import datetime
+from types import MappingProxyType
 import pytz
+from timezone_resolver import format_offset, to_utc
+
+# Zero-based day-of-year of each month's day 0 in a leap year (so Feb 29 has a slot);
+# the day-of-year index of a date is _MONTH_OFFSETS[month] + day
+_MONTH_OFFSETS = (None, -1, 30, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334)
+
+
+def _freeze(value):
+    """Recursively convert dicts/lists into read-only mappings and tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _build_sun_sign_table(signs):
+    """Resolve the sun sign of every calendar day once, using the sign date ranges"""
+    table = [signs[0]] * 366
+    for month in range(1, 13):
+        for day in range(1, monthrange(2000, month)[1] + 1):
+            for sign in signs:
+                start_month, start_day = sign["start"]
+                end_month, end_day = sign["end"]
+                
+                if start_month == end_month:
+                    if start_day <= day <= end_day:
+                        table[_MONTH_OFFSETS[month] + day] = sign
+                        break
+                elif (month == start_month and day >= start_day) or (month == end_month and day <= end_day):
+                    table[_MONTH_OFFSETS[month] + day] = sign
+                    break
+    return tuple(table)
+
+
+def _build_compatibility_matrix(signs, characteristics):
+    """12x12 boolean matrix of the compatibility lists, in ZODIAC_SIGNS order"""
+    return tuple(
+        tuple(other["name"] in characteristics[sign["name"]]["compatibility"] for other in signs)
+        for sign in signs
+    )
+
 
 class AstrologyEngine:
     """Core astrology calculations engine"""
@@ -41,39 +86,173 @@ class AstrologyEngine:
         "Saturn": {"strength": "discipline", "positive": "responsibility, wisdom"},
     }
     
-    def __init__(self):
-        self.observer = ephem.Observer()
+    # Personality characteristics per sign, frozen so lookups can share them
+    SIGN_CHARACTERISTICS = _freeze({
+        "Aries": {
+            "traits": ["Courageous", "Passionate", "Determined", "Independent"],
+            "strengths": ["Leadership", "Initiative", "Enthusiasm"],
+            "weaknesses": ["Impulsivity", "Aggressive", "Impatient"],
+            "compatibility": ["Leo", "Sagittarius", "Gemini", "Aquarius"]
+        },
+        "Taurus": {
+            "traits": ["Reliable", "Patient", "Practical", "Devoted"],
+            "strengths": ["Stability", "Loyalty", "Determination"],
+            "weaknesses": ["Stubbornness", "Possessiveness", "Materialism"],
+            "compatibility": ["Capricorn", "Virgo", "Cancer", "Pisces"]
+        },
+        "Gemini": {
+            "traits": ["Curious", "Adaptable", "Outgoing", "Intelligent"],
+            "strengths": ["Communication", "Versatility", "Mental Agility"],
+            "weaknesses": ["Inconsistency", "Nervousness", "Superficiality"],
+            "compatibility": ["Aquarius", "Libra", "Aries", "Leo"]
+        },
+        "Cancer": {
+            "traits": ["Emotional", "Intuitive", "Protective", "Loyal"],
+            "strengths": ["Empathy", "Intuition", "Nurturing"],
+            "weaknesses": ["Moodiness", "Insecurity", "Manipulation"],
+            "compatibility": ["Pisces", "Scorpio", "Taurus", "Virgo"]
+        },
+        "Leo": {
+            "traits": ["Confident", "Generous", "Warm", "Creative"],
+            "strengths": ["Leadership", "Confidence", "Creativity"],
+            "weaknesses": ["Arrogance", "Pride", "Stubbornness"],
+            "compatibility": ["Sagittarius", "Aries", "Gemini", "Libra"]
+        },
+        "Virgo": {
+            "traits": ["Analytical", "Practical", "Modest", "Reliable"],
+            "strengths": ["Perfection", "Analysis", "Reliability"],
+            "weaknesses": ["Overthinking", "Criticism", "Worry"],
+            "compatibility": ["Capricorn", "Taurus", "Cancer", "Scorpio"]
+        },
+        "Libra": {
+            "traits": ["Diplomatic", "Fair", "Social", "Artistic"],
+            "strengths": ["Balance", "Diplomacy", "Artistry"],
+            "weaknesses": ["Indecision", "Avoidance", "Superficiality"],
+            "compatibility": ["Aquarius", "Gemini", "Leo", "Sagittarius"]
+        },
+        "Scorpio": {
+            "traits": ["Passionate", "Secretive", "Intense", "Determined"],
+            "strengths": ["Passion", "Intuition", "Power"],
+            "weaknesses": ["Secretiveness", "Jealousy", "Obsession"],
+            "compatibility": ["Pisces", "Cancer", "Virgo", "Capricorn"]
+        },
+        "Sagittarius": {
+            "traits": ["Optimistic", "Adventurous", "Honest", "Philosophical"],
+            "strengths": ["Optimism", "Adventure", "Honesty"],
+            "weaknesses": ["Overconfidence", "Carelessness", "Bluntness"],
+            "compatibility": ["Aries", "Leo", "Libra", "Aquarius"]
+        },
+        "Capricorn": {
+            "traits": ["Ambitious", "Disciplined", "Responsible", "Self-controlled"],
+            "strengths": ["Discipline", "Responsibility", "Ambition"],
+            "weaknesses": ["Coldness", "Unforgiving", "Condescending"],
+            "compatibility": ["Taurus", "Virgo", "Scorpio", "Pisces"]
+        },
+        "Aquarius": {
+            "traits": ["Independent", "Intellectual", "Humanitarian", "Progressive"],
+            "strengths": ["Innovation", "Humanitarianism", "Intellectual"],
+            "weaknesses": ["Detachment", "Unpredictability", "Stubbornness"],
+            "compatibility": ["Gemini", "Libra", "Sagittarius", "Aries"]
+        },
+        "Pisces": {
+            "traits": ["Compassionate", "Artistic", "Intuitive", "Gentle"],
+            "strengths": ["Compassion", "Artistry", "Intuition"],
+            "weaknesses": ["Escapism", "Oversensitivity", "Fearfulness"],
+            "compatibility": ["Cancer", "Scorpio", "Taurus", "Capricorn"]
+        },
+    })
+    
+    SIGN_INDEX = {sign["name"]: index for index, sign in enumerate(ZODIAC_SIGNS)}
+    
+    # COMPATIBILITY_MATRIX[SIGN_INDEX[a]][SIGN_INDEX[b]] is True when a lists b as compatible
+    COMPATIBILITY_MATRIX = _build_compatibility_matrix(ZODIAC_SIGNS, SIGN_CHARACTERISTICS)
+    
+    # Sun sign for every day of a leap year, indexed by _MONTH_OFFSETS[month] + day
+    _SUN_SIGN_BY_DAY = _build_sun_sign_table(ZODIAC_SIGNS)
+    
+    # Sections of a birth chart that can be requested individually
+    CHART_SECTIONS = ("sun_sign", "element", "life_path_number", "characteristics", "planetary_positions")
+    
+    PLANET_NAMES = ["Sun", "Moon", "Mercury", "Venus", "Mars", "Jupiter", "Saturn"]
+    
+    def __init__(self, ephemeris_table=None, chart_cache=None, timezone_resolver=None):
+        # ephem observers and bodies are mutated by compute(), so every thread
+        # gets its own set instead of sharing one across requests
+        self._local = threading.local()
+        # Optional precomputed EphemerisTable; live ephem is used outside its range
+        self.ephemeris_table = ephemeris_table
+        # Optional ChartCache memoizing charts by birth time and (quantized) place
+        self.chart_cache = chart_cache
+        # Optional TimezoneResolver; without one, birth times are taken as UTC
+        self.timezone_resolver = timezone_resolver
     
     def get_sun_sign(self, birth_date):
         """Calculate sun sign (zodiac) based on birth date"""
-        month, day = birth_date.month, birth_date.day
+        return self._SUN_SIGN_BY_DAY[_MONTH_OFFSETS[birth_date.month] + birth_date.day]
+    
+    def is_compatible(self, sign1, sign2):
+        """Whether sign1 lists sign2 as compatible; unknown signs never are"""
+        index1 = self.SIGN_INDEX.get(sign1)
+        index2 = self.SIGN_INDEX.get(sign2)
+        if index1 is None or index2 is None:
+            return False
+        return self.COMPATIBILITY_MATRIX[index1][index2]
+    
+    def get_planetary_positions(self, birth_date, latitude, longitude):
+        """Calculate planetary positions at a birth time given in UTC"""
+        if self.chart_cache is None:
+            return self._compute_planetary_positions(birth_date, latitude, longitude)
         
-        for sign in self.ZODIAC_SIGNS:
-            start_month, start_day = sign["start"]
-            end_month, end_day = sign["end"]
-            
-            if start_month == end_month:
-                if start_day <= day <= end_day:
-                    return sign
-            else:
-                if (month == start_month and day >= start_day) or (month == end_month and day <= end_day):
-                    return sign
+        latitude, longitude = self.chart_cache.quantize(latitude, longitude)
+        key = ("positions", birth_date, latitude, longitude)
+        positions = self.chart_cache.get(key)
+        if positions is None:
+            positions = self._compute_planetary_positions(birth_date, latitude, longitude)
+            self.chart_cache.set(key, positions)
+        return positions
+    
+    def _compute_planetary_positions(self, birth_date, latitude, longitude):
+        """Compute planetary positions without consulting the chart cache"""
+        if self.ephemeris_table is not None:
+            positions = self.ephemeris_table.positions(birth_date, latitude, longitude)
+            if positions is not None:
+                return positions
         
-        return self.ZODIAC_SIGNS[0]
+        observer, planets = self._get_ephem_objects()
+        observer.lat = str(latitude)
+        observer.lon = str(longitude)
+        observer.date = birth_date
+        
+        return self._read_positions(observer, planets)
     
-    def get_planetary_positions(self, birth_date, latitude, longitude):
-        """Calculate planetary positions at birth time"""
-        self.observer.lat = str(latitude)
-        self.observer.lon = str(longitude)
-        self.observer.date = birth_date
+    def iter_planetary_positions(self, start, end, step, latitude, longitude):
+        """Yield (datetime, positions) from start to end inclusive, every step"""
+        # A generator may be suspended between rows, so it owns its ephem objects
+        observer, planets = self._new_ephem_objects()
+        observer.lat = str(latitude)
+        observer.lon = str(longitude)
         
+        if start > end:
+            return
+        moment = start
+        while True:
+            positions = None
+            if self.ephemeris_table is not None:
+                positions = self.ephemeris_table.positions(moment, latitude, longitude)
+            if positions is None:
+                observer.date = moment
+                positions = self._read_positions(observer, planets)
+            yield moment, positions
+            # Compare before adding: moment + step may overflow datetime
+            if end - moment < step:
+                break
+            moment += step
+    
+    def _read_positions(self, observer, planets):
+        """Compute every planet for a prepared observer"""
         positions = {}
-        planets = [ephem.Sun(), ephem.Moon(), ephem.Mercury(), 
-                   ephem.Venus(), ephem.Mars(), ephem.Jupiter(), ephem.Saturn()]
-        planet_names = ["Sun", "Moon", "Mercury", "Venus", "Mars", "Jupiter", "Saturn"]
-        
-        for planet, name in zip(planets, planet_names):
-            planet.compute(self.observer)
+        for planet, name in zip(planets, self.PLANET_NAMES):
+            planet.compute(observer)
             positions[name] = {
                 "ra": float(planet.ra),
                 "dec": float(planet.dec),
@@ -83,6 +262,19 @@ class AstrologyEngine:
         
         return positions
     
+    def _get_ephem_objects(self):
+        """Get this thread's observer and planet bodies, creating them on first use"""
+        objects = getattr(self._local, "objects", None)
+        if objects is None:
+            objects = self._new_ephem_objects()
+            self._local.objects = objects
+        return objects
+    
+    def _new_ephem_objects(self):
+        planets = [ephem.Sun(), ephem.Moon(), ephem.Mercury(),
+                   ephem.Venus(), ephem.Mars(), ephem.Jupiter(), ephem.Saturn()]
+        return ephem.Observer(), planets
+    
     def calculate_life_path_number(self, birth_date):
         """Calculate life path number from birth date (numerology)"""
         total = sum(int(digit) for digit in birth_date.strftime("%Y%m%d"))
@@ -90,109 +282,103 @@ class AstrologyEngine:
             total = sum(int(digit) for digit in str(total))
         return total
     
-    def generate_birth_chart_analysis(self, name, birth_date, latitude, longitude, gender):
-        """Generate comprehensive birth chart analysis"""
-        sun_sign = self.get_sun_sign(birth_date)
-        element = self.ELEMENTS.get(sun_sign["name"], "Unknown")
-        life_path = self.calculate_life_path_number(birth_date)
-        
-        analysis = {
+    def resolve_birth_time(self, birth_date, latitude, longitude, timezone=None):
+        """(timezone name, UTC datetime) for a local birth time at the given place"""
+        if timezone is None:
+            if self.timezone_resolver is None:
+                return "UTC", birth_date
+            timezone = self.timezone_resolver.zone_name(latitude, longitude)
+        return timezone, to_utc(birth_date, timezone)
+    
+    def birth_chart_header(self, name, birth_date, latitude, longitude, gender, timezone=None):
+        """(header entries of a birth chart analysis, UTC birth datetime)"""
+        timezone, utc_date = self.resolve_birth_time(birth_date, latitude, longitude, timezone)
+        header = {
             "name": name,
             "birth_date": birth_date.strftime("%Y-%m-%d"),
             "gender": gender,
             "location": {"latitude": latitude, "longitude": longitude},
-            "sun_sign": sun_sign,
-            "element": element,
-            "life_path_number": life_path,
-            "characteristics": self._get_sign_characteristics(sun_sign["name"]),
-            "planetary_positions": self.get_planetary_positions(birth_date, latitude, longitude),
+            "timezone": {
+                "name": timezone,
+                "utc_offset": format_offset(birth_date - utc_date),
+                "birth_datetime_utc": utc_date.isoformat(),
+            },
         }
+        return header, utc_date
+    
+    def generate_birth_chart_analysis(self, name, birth_date, latitude, longitude, gender, fields=None,
+                                      timezone=None):
+        """Generate comprehensive birth chart analysis
+        
+        ``birth_date`` is local time at the birth place, in ``timezone`` or the
+        zone resolved from the coordinates. ``fields`` limits the result to the
+        named CHART_SECTIONS; sections that are not requested are never
+        computed. None means all sections.
+        """
+        analysis, utc_date = self.birth_chart_header(name, birth_date, latitude, longitude, gender, timezone)
+        if fields is None or "planetary_positions" in fields:
+            # Positions dominate the cost, so go through the chart cache for them
+            core = self._get_chart_core(birth_date, utc_date, latitude, longitude)
+            if fields is not None:
+                core = {section: value for section, value in core.items() if section in fields}
+        else:
+            core = self._compute_chart_core(birth_date, utc_date, latitude, longitude, fields)
+        analysis.update(core)
         
         return analysis
     
-    def _get_sign_characteristics(self, sign_name):
-        """Get personality characteristics for a zodiac sign"""
-        characteristics = {
-            "Aries": {
-                "traits": ["Courageous", "Passionate", "Determined", "Independent"],
-                "strengths": ["Leadership", "Initiative", "Enthusiasm"],
-                "weaknesses": ["Impulsivity", "Aggressive", "Impatient"],
-                "compatibility": ["Leo", "Sagittarius", "Gemini", "Aquarius"]
-            },
-            "Taurus": {
-                "traits": ["Reliable", "Patient", "Practical", "Devoted"],
-                "strengths": ["Stability", "Loyalty", "Determination"],
-                "weaknesses": ["Stubbornness", "Possessiveness", "Materialism"],
-                "compatibility": ["Capricorn", "Virgo", "Cancer", "Pisces"]
-            },
-            "Gemini": {
-                "traits": ["Curious", "Adaptable", "Outgoing", "Intelligent"],
-                "strengths": ["Communication", "Versatility", "Mental Agility"],
-                "weaknesses": ["Inconsistency", "Nervousness", "Superficiality"],
-                "compatibility": ["Aquarius", "Libra", "Aries", "Leo"]
-            },
-            "Cancer": {
-                "traits": ["Emotional", "Intuitive", "Protective", "Loyal"],
-                "strengths": ["Empathy", "Intuition", "Nurturing"],
-                "weaknesses": ["Moodiness", "Insecurity", "Manipulation"],
-                "compatibility": ["Pisces", "Scorpio", "Taurus", "Virgo"]
-            },
-            "Leo": {
-                "traits": ["Confident", "Generous", "Warm", "Creative"],
-                "strengths": ["Leadership", "Confidence", "Creativity"],
-                "weaknesses": ["Arrogance", "Pride", "Stubbornness"],
-                "compatibility": ["Sagittarius", "Aries", "Gemini", "Libra"]
-            },
-            "Virgo": {
-                "traits": ["Analytical", "Practical", "Modest", "Reliable"],
-                "strengths": ["Perfection", "Analysis", "Reliability"],
-                "weaknesses": ["Overthinking", "Criticism", "Worry"],
-                "compatibility": ["Capricorn", "Taurus", "Cancer", "Scorpio"]
-            },
-            "Libra": {
-                "traits": ["Diplomatic", "Fair", "Social", "Artistic"],
-                "strengths": ["Balance", "Diplomacy", "Artistry"],
-                "weaknesses": ["Indecision", "Avoidance", "Superficiality"],
-                "compatibility": ["Aquarius", "Gemini", "Leo", "Sagittarius"]
-            },
-            "Scorpio": {
-                "traits": ["Passionate", "Secretive", "Intense", "Determined"],
-                "strengths": ["Passion", "Intuition", "Power"],
-                "weaknesses": ["Secretiveness", "Jealousy", "Obsession"],
-                "compatibility": ["Pisces", "Cancer", "Virgo", "Capricorn"]
-            },
-            "Sagittarius": {
-                "traits": ["Optimistic", "Adventurous", "Honest", "Philosophical"],
-                "strengths": ["Optimism", "Adventure", "Honesty"],
-                "weaknesses": ["Overconfidence", "Carelessness", "Bluntness"],
-                "compatibility": ["Aries", "Leo", "Libra", "Aquarius"]
-            },
-            "Capricorn": {
-                "traits": ["Ambitious", "Disciplined", "Responsible", "Self-controlled"],
-                "strengths": ["Discipline", "Responsibility", "Ambition"],
-                "weaknesses": ["Coldness", "Unforgiving", "Condescending"],
-                "compatibility": ["Taurus", "Virgo", "Scorpio", "Pisces"]
-            },
-            "Aquarius": {
-                "traits": ["Independent", "Intellectual", "Humanitarian", "Progressive"],
-                "strengths": ["Innovation", "Humanitarianism", "Intellectual"],
-                "weaknesses": ["Detachment", "Unpredictability", "Stubbornness"],
-                "compatibility": ["Gemini", "Libra", "Sagittarius", "Aries"]
-            },
-            "Pisces": {
-                "traits": ["Compassionate", "Artistic", "Intuitive", "Gentle"],
-                "strengths": ["Compassion", "Artistry", "Intuition"],
-                "weaknesses": ["Escapism", "Oversensitivity", "Fearfulness"],
-                "compatibility": ["Cancer", "Scorpio", "Taurus", "Capricorn"]
-            },
+    def _get_chart_core(self, birth_date, utc_date, latitude, longitude):
+        """Chart sections that depend only on birth time and place"""
+        if self.chart_cache is None:
+            return self._compute_chart_core(birth_date, utc_date, latitude, longitude)
+        
+        latitude, longitude = self.chart_cache.quantize(latitude, longitude)
+        key = ("chart", birth_date, utc_date, latitude, longitude)
+        core = self.chart_cache.get(key)
+        if core is None:
+            core = self._compute_chart_core(birth_date, utc_date, latitude, longitude)
+            self.chart_cache.set(key, core)
+        return core
+    
+    def _compute_chart_core(self, birth_date, utc_date, latitude, longitude, fields=None):
+        # Calendar-based sections use the local date; positions need UTC
+        sun_sign = self.get_sun_sign(birth_date)
+        # Each section is only evaluated when requested
+        sections = {
+            "sun_sign": lambda: sun_sign,
+            "element": lambda: self.ELEMENTS.get(sun_sign["name"], "Unknown"),
+            "life_path_number": lambda: self.calculate_life_path_number(birth_date),
+            "characteristics": lambda: self._get_sign_characteristics(sun_sign["name"]),
+            "planetary_positions": lambda: self._compute_planetary_positions(utc_date, latitude, longitude),
         }
         
-        return characteristics.get(sign_name, {})
+        return {section: build() for section, build in sections.items()
+                if fields is None or section in fields}
+    
+    def _get_sign_characteristics(self, sign_name):
+        """Get personality characteristics for a zodiac sign"""
+        characteristics = self.SIGN_CHARACTERISTICS.get(sign_name)
+        if characteristics is None:
+            return {}
+        # Hand out plain lists so callers can modify their copy freely
+        return {key: list(values) for key, values in characteristics.items()}
     
     def generate_life_prediction(self, birth_date, gender):
         """Generate life predictions based on birth data"""
-        from datetime import datetime, timedelta
+        age, current_phase = self.get_life_phase(birth_date)
+        
+        prediction = {
+            "current_age": age,
+            "current_life_phase": current_phase,
+            "past_prediction": self._generate_past_prediction(age, gender),
+            "present_prediction": self._generate_present_prediction(age, gender),
+            "future_prediction": self._generate_future_prediction(age, gender),
+        }
         
+        return prediction
+    
+    def get_life_phase(self, birth_date):
+        """Current age in years and the life phase it falls in"""
         today = datetime.now()
         age = (today - birth_date).days // 365
         
@@ -212,15 +398,7 @@ class AstrologyEngine:
         elif age >= senior_start:
             current_phase = "Senior"
         
-        prediction = {
-            "current_age": age,
-            "current_life_phase": current_phase,
-            "past_prediction": self._generate_past_prediction(age, gender),
-            "present_prediction": self._generate_present_prediction(age, gender),
-            "future_prediction": self._generate_future_prediction(age, gender),
-        }
-        
-        return prediction
+        return age, current_phase
     
     def _generate_past_prediction(self, age, gender):
         """Generate prediction for past (birth to now)"""
@@ -0,0 +1,273 @@
+"""Benchmark and load-regression suite for the engine and API.
+
+Micro-benchmarks time the core AstrologyEngine calls; load tests drive the
+main endpoints through Flask's test client at several concurrency levels.
+Results are written as JSON and can be compared against a saved baseline:
+
+    python benchmark.py run -o baseline.json
+    python benchmark.py run -o current.json --compare baseline.json --threshold 0.15
+    python benchmark.py compare baseline.json current.json
+
+``compare`` (and ``run --compare``) exits with status 1 when any latency
+percentile or throughput figure regresses by more than the threshold, or
+when any request in the current run failed.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Measure the engine itself rather than cache hits or disk writes, unless the
+# caller explicitly configures otherwise
+os.environ.setdefault("CHART_CACHE_SIZE", "0")
+os.environ.setdefault("PREDICTION_STORE", "memory")
+# The load tests drive the app far past any per-client or concurrency limit;
+# time the predictions, not 429/503 rejections
+os.environ.setdefault("RATE_LIMIT_PER_SECOND", "0")
+os.environ.setdefault("ADMISSION_MAX_CONCURRENT", "0")
+
+from astrology_engine import AstrologyEngine  # noqa: E402
+
+CONCURRENCY_LEVELS = (1, 4, 16)
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def _random_birth(rng):
+    moment = datetime(1940, 1, 1) + timedelta(minutes=rng.randrange(0, 70 * 365 * 24 * 60))
+    return moment, round(rng.uniform(-60, 60), 4), round(rng.uniform(-180, 180), 4)
+
+
+def _random_payload(rng):
+    moment, latitude, longitude = _random_birth(rng)
+    return {
+        "name": "Bench User",
+        "birth_date": moment.strftime("%Y-%m-%d"),
+        "birth_time": moment.strftime("%H:%M"),
+        "latitude": latitude,
+        "longitude": longitude,
+        "gender": rng.choice(["Male", "Female", "Other"])
+    }
+
+
+def time_call(func, args_list, repeats):
+    """Time ``func`` over ``args_list`` ``repeats`` times; per-call microseconds"""
+    per_call = []
+    for _ in range(repeats):
+        began = time.perf_counter()
+        for args in args_list:
+            func(*args)
+        per_call.append((time.perf_counter() - began) / len(args_list) * 1e6)
+    median = statistics.median(per_call)
+    return {
+        "median_us": median,
+        "min_us": min(per_call),
+        "ops_per_sec": 1e6 / median if median else 0.0
+    }
+
+
+def run_micro(iterations, repeats, seed=0):
+    """Micro-benchmarks of the core engine functions"""
+    rng = random.Random(seed)
+    engine = AstrologyEngine()
+    births = [_random_birth(rng) for _ in range(iterations)]
+    genders = [rng.choice(["Male", "Female", "Other"]) for _ in range(iterations)]
+
+    return {
+        "get_sun_sign": time_call(
+            engine.get_sun_sign, [(moment,) for moment, _, _ in births], repeats),
+        "calculate_life_path_number": time_call(
+            engine.calculate_life_path_number, [(moment,) for moment, _, _ in births], repeats),
+        "get_planetary_positions": time_call(
+            engine.get_planetary_positions, births, repeats),
+        "generate_life_prediction": time_call(
+            engine.generate_life_prediction,
+            [(moment, gender) for (moment, _, _), gender in zip(births, genders)], repeats),
+        "generate_birth_chart_analysis": time_call(
+            engine.generate_birth_chart_analysis,
+            [("Bench User", moment, latitude, longitude, gender)
+             for (moment, latitude, longitude), gender in zip(births, genders)], repeats),
+    }
+
+
+def run_load(app, method, path, make_payload, requests_total, concurrency, seed=0):
+    """Drive one endpoint with ``concurrency`` client threads"""
+    rng = random.Random(seed)
+    payloads = [make_payload(rng) for _ in range(requests_total)]
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker(chunk):
+        client = app.test_client()
+        local_latencies = []
+        local_errors = 0
+        for payload in chunk:
+            began = time.perf_counter()
+            response = client.open(path, method=method, json=payload)
+            response.get_data()
+            local_latencies.append((time.perf_counter() - began) * 1e3)
+            if response.status_code >= 400:
+                local_errors += 1
+        with lock:
+            latencies.extend(local_latencies)
+            errors.append(local_errors)
+
+    chunks = [payloads[i::concurrency] for i in range(concurrency)]
+    threads = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+
+    return {
+        "requests": requests_total,
+        "concurrency": concurrency,
+        "errors": sum(errors),
+        "p50_ms": _percentile(latencies, 0.50),
+        "p95_ms": _percentile(latencies, 0.95),
+        "p99_ms": _percentile(latencies, 0.99),
+        "throughput_rps": requests_total / elapsed if elapsed else 0.0
+    }
+
+
+def run_suite(quick=False, seed=0):
+    """Run all micro-benchmarks and load tests"""
+    from app import app
+
+    iterations, repeats, requests_total = (50, 3, 100) if quick else (200, 5, 400)
+    signs = [sign["name"] for sign in AstrologyEngine.ZODIAC_SIGNS]
+
+    endpoints = {
+        "predict": ("POST", "/api/predict", _random_payload),
+        "zodiac-compatibility": ("POST", "/api/zodiac-compatibility",
+                                 lambda rng: {"sign1": rng.choice(signs), "sign2": rng.choice(signs)}),
+        "zodiac-signs": ("GET", "/api/zodiac-signs", lambda rng: None),
+    }
+
+    load = {}
+    for name, (method, path, make_payload) in endpoints.items():
+        for concurrency in CONCURRENCY_LEVELS:
+            load[f"{name}@{concurrency}"] = run_load(
+                app, method, path, make_payload, requests_total, concurrency, seed)
+
+    return {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "quick": quick
+        },
+        "micro": run_micro(iterations, repeats, seed),
+        "load": load
+    }
+
+
+def compare_results(baseline, current, threshold):
+    """List (name, metric, baseline, current, change, regressed) for shared metrics"""
+    rows = []
+
+    def check(name, metric, old, new, higher_is_better):
+        if not old:
+            return
+        change = (new - old) / old
+        regressed = change < -threshold if higher_is_better else change > threshold
+        rows.append((name, metric, old, new, change, regressed))
+
+    for name, old in baseline.get("micro", {}).items():
+        new = current.get("micro", {}).get(name)
+        if new:
+            check(name, "median_us", old["median_us"], new["median_us"], False)
+
+    for name, old in baseline.get("load", {}).items():
+        new = current.get("load", {}).get(name)
+        if new:
+            for metric in ("p50_ms", "p95_ms", "p99_ms"):
+                check(name, metric, old[metric], new[metric], False)
+            check(name, "throughput_rps", old["throughput_rps"], new["throughput_rps"], True)
+            # Failing fast looks like a speed-up, so any failures in the current
+            # run, or more than in the baseline, are regressions on their own
+            old_errors, new_errors = old.get("errors", 0), new.get("errors", 0)
+            if old_errors or new_errors:
+                change = (new_errors - old_errors) / old_errors if old_errors else float("inf")
+                rows.append((name, "errors", old_errors, new_errors, change, new_errors > 0))
+
+    return rows
+
+
+def print_comparison(rows, threshold):
+    print(f"{'Benchmark':<34}{'Metric':<16}{'Baseline':>12}{'Current':>12}{'Change':>10}")
+    for name, metric, old, new, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<34}{metric:<16}{old:>12.3f}{new:>12.3f}{change:>+9.1%}{flag}")
+    regressions = sum(1 for row in rows if row[5])
+    print(f"\n{regressions} regression(s) beyond {threshold:.0%}")
+    return regressions
+
+
+def print_results(results):
+    print(f"{'Micro-benchmark':<34}{'Median us':>12}{'Ops/sec':>14}")
+    for name, stats in results["micro"].items():
+        print(f"{name:<34}{stats['median_us']:>12.2f}{stats['ops_per_sec']:>14.0f}")
+    print()
+    print(f"{'Load test':<34}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>10}{'errors':>8}")
+    for name, stats in results["load"].items():
+        print(f"{name:<34}{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}"
+              f"{stats['throughput_rps']:>10.1f}{stats['errors']:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the astrology engine and API")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the suite and save results")
+    run_parser.add_argument("-o", "--output", default="benchmark-results.json")
+    run_parser.add_argument("--quick", action="store_true", help="Fewer iterations")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--compare", metavar="BASELINE", help="Baseline to compare against")
+    run_parser.add_argument("--threshold", type=float, default=0.15)
+
+    compare_parser = commands.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.15)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        results = run_suite(quick=args.quick, seed=args.seed)
+        with open(args.output, "w") as out:
+            json.dump(results, out, indent=2)
+        print_results(results)
+        print(f"\nSaved results to {args.output}")
+        if not args.compare:
+            return 0
+        baseline_path, current = args.compare, results
+    else:
+        baseline_path = args.baseline
+        with open(args.current) as current_file:
+            current = json.load(current_file)
+
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)
+    print()
+    regressions = print_comparison(compare_results(baseline, current, args.threshold), args.threshold)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+"""Offline bulk chart generation for large CSV or NDJSON exports.
+
+Records are read as a stream and sent to a process pool in chunks, with a
+bounded number of chunks in flight, so memory stays flat however large the
+input is. Results are written as NDJSON in input order, one line per record,
+in the same shape as the items of ``/api/predict/batch``. A checkpoint file
+records how many input records are done and the output size at that point;
+``--resume`` truncates the output back to it and skips the finished records:
+
+    python bulk_charts.py births.csv -o charts.ndjson --workers 8
+    python bulk_charts.py births.csv -o charts.ndjson --workers 8 --resume
+
+Input records use the ``/api/predict`` fields: name, birth_date, birth_time,
+latitude, longitude and gender.
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Bulk input rarely repeats a chart
+os.environ.setdefault("CHART_CACHE_SIZE", "0")
+
+from predictions import build_prediction, parse_fields, parse_prediction_input  # noqa: E402
+
+
+def read_records(stream, input_format):
+    """Yield input records one at a time; malformed NDJSON lines yield an error string"""
+    if input_format == "csv":
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield f"Invalid JSON: {str(e)}"
+
+
+def compute_chunk(start_index, records, fields):
+    """Compute one chunk of records in a worker, returning encoded NDJSON lines"""
+    lines = []
+    failed = 0
+    for index, record in enumerate(records, start_index):
+        if isinstance(record, str):
+            result = {"index": index, "success": False, "error": record}
+        else:
+            # One malformed row must not kill the job: --resume would stop at it again
+            try:
+                params, error = parse_prediction_input(record, default_fields=fields)
+                if error:
+                    result = {"index": index, "success": False, "error": error}
+                else:
+                    result = dict(build_prediction(params), index=index)
+            except Exception as e:
+                result = {"index": index, "success": False, "error": f"Server error: {str(e)}"}
+        if not result["success"]:
+            failed += 1
+        lines.append(json.dumps(result, sort_keys=True, separators=(",", ":")))
+    data = ("\n".join(lines) + "\n").encode("utf-8")
+    return data, len(records), failed
+
+
+def load_checkpoint(path):
+    """Read a checkpoint, or None if there isn't one"""
+    try:
+        with open(path) as checkpoint_file:
+            return json.load(checkpoint_file)
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(path, records_done, failed, output_offset):
+    """Atomically replace the checkpoint file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as out:
+        json.dump({"records_done": records_done, "failed": failed, "output_offset": output_offset}, out)
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp_path, path)
+
+
+class Progress:
+    """Periodic progress and throughput reports on stderr"""
+
+    def __init__(self, interval, records_done=0, failed=0):
+        self.interval = interval
+        self.began = time.perf_counter()
+        self.last_report = self.began
+        self.initial = records_done
+        self.records_done = records_done
+        self.failed = failed
+
+    def update(self, records, failed):
+        self.records_done += records
+        self.failed += failed
+        now = time.perf_counter()
+        if now - self.last_report >= self.interval:
+            self.last_report = now
+            self.report(now)
+
+    def report(self, now=None):
+        elapsed = (now or time.perf_counter()) - self.began
+        processed = self.records_done - self.initial
+        rate = processed / elapsed if elapsed else 0.0
+        sys.stderr.write(f"{self.records_done} records done ({self.failed} failed), "
+                         f"{rate:.0f} records/s, {elapsed:.0f}s elapsed\n")
+        sys.stderr.flush()
+
+
+def run(input_path, output_path, input_format, checkpoint_path, resume=False, workers=None,
+        chunk_size=200, window=None, fields=None, checkpoint_interval=5.0, progress_interval=5.0):
+    """Stream ``input_path`` through the engine into ``output_path``; returns (records, failed)"""
+    workers = workers or os.cpu_count() or 1
+    window = window or workers * 2
+
+    checkpoint = load_checkpoint(checkpoint_path) if resume else None
+    records_done = checkpoint["records_done"] if checkpoint else 0
+
+    output = open(output_path, "r+b" if checkpoint else "wb")
+    if checkpoint:
+        # Drop anything written after the last checkpoint
+        output.truncate(checkpoint["output_offset"])
+        output.seek(checkpoint["output_offset"])
+        sys.stderr.write(f"Resuming after {records_done} records\n")
+
+    stream = sys.stdin if input_path == "-" else open(input_path, newline="", encoding="utf-8")
+    progress = Progress(progress_interval, records_done, checkpoint.get("failed", 0) if checkpoint else 0)
+    last_checkpoint = time.perf_counter()
+    in_flight = deque()
+
+    def write_oldest():
+        data, records, failed = in_flight.popleft().result()
+        output.write(data)
+        progress.update(records, failed)
+
+    try:
+        records = itertools.islice(read_records(stream, input_format), records_done, None)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            next_index = records_done
+            while True:
+                chunk = list(itertools.islice(records, chunk_size))
+                if not chunk:
+                    break
+                in_flight.append(executor.submit(compute_chunk, next_index, chunk, fields))
+                next_index += len(chunk)
+
+                # Bound memory: wait for the oldest chunk before reading further
+                while len(in_flight) >= window:
+                    write_oldest()
+
+                if time.perf_counter() - last_checkpoint >= checkpoint_interval:
+                    output.flush()
+                    os.fsync(output.fileno())
+                    save_checkpoint(checkpoint_path, progress.records_done, progress.failed, output.tell())
+                    last_checkpoint = time.perf_counter()
+
+            while in_flight:
+                write_oldest()
+        output.flush()
+        os.fsync(output.fileno())
+        save_checkpoint(checkpoint_path, progress.records_done, progress.failed, output.tell())
+    finally:
+        output.close()
+        if stream is not sys.stdin:
+            stream.close()
+
+    progress.report()
+    return progress.records_done, progress.failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compute charts for a CSV or NDJSON file of birth records")
+    parser.add_argument("input", help="Input file path, or - for stdin")
+    parser.add_argument("-o", "--output", required=True, help="Output NDJSON file path")
+    parser.add_argument("--format", choices=["csv", "ndjson"],
+                        help="Input format (default: from the file extension)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=200, help="Records per task")
+    parser.add_argument("--window", type=int, default=None,
+                        help="Chunks in flight at once (default: twice the workers)")
+    parser.add_argument("--fields", default=None,
+                        help="Comma-separated response fields, as for /api/predict")
+    parser.add_argument("--checkpoint", default=None,
+                        help="Checkpoint file path (default: OUTPUT.checkpoint)")
+    parser.add_argument("--checkpoint-interval", type=float, default=5.0,
+                        help="Seconds between checkpoints")
+    parser.add_argument("--progress-interval", type=float, default=5.0,
+                        help="Seconds between progress reports")
+    parser.add_argument("--resume", action="store_true", help="Continue from the checkpoint")
+
+    args = parser.parse_args(argv)
+
+    input_format = args.format
+    if input_format is None:
+        input_format = "csv" if args.input.lower().endswith(".csv") else "ndjson"
+    checkpoint_path = args.checkpoint or f"{args.output}.checkpoint"
+
+    _, error = parse_fields(args.fields)
+    if error:
+        parser.error(error)
+
+    if args.resume and load_checkpoint(checkpoint_path) is None:
+        sys.stderr.write(f"No checkpoint at {checkpoint_path}; starting from the beginning\n")
+
+    began = time.perf_counter()
+    try:
+        total, failed = run(
+            args.input, args.output, input_format, checkpoint_path,
+            resume=args.resume,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            window=args.window,
+            fields=args.fields,
+            checkpoint_interval=args.checkpoint_interval,
+            progress_interval=args.progress_interval
+        )
+    except BrokenProcessPool as e:
+        sys.stderr.write(f"Worker pool failed: {str(e)}; rerun with --resume to continue\n")
+        return 1
+
+    print(f"Wrote {total} records ({failed} failed) to {args.output} "
+          f"in {time.perf_counter() - began:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
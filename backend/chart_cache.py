@@ -0,0 +1,82 @@
+"""Memoization of chart computations keyed on birth time and place.
+
+Coordinates can be quantized to a grid so that births in the same city share
+cache entries; the engine then computes positions at the quantized point, so
+results stay deterministic regardless of which request filled the entry.
+"""
+
+import threading
+from collections import OrderedDict
+
+
+def clone(value):
+    """Copy the dict/list structure of a chart so callers never share it"""
+    if isinstance(value, dict):
+        return {key: clone(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [clone(item) for item in value]
+    return value
+
+
+class ChartCache:
+    """Thread-safe LRU cache for chart data with hit/miss/eviction counters"""
+
+    def __init__(self, max_size=10000, quantization=0.0):
+        self.max_size = max_size
+        # Grid step in degrees for latitude/longitude; 0 keeps exact coordinates
+        self.quantization = quantization
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def quantize(self, latitude, longitude):
+        """Snap coordinates to the cache grid"""
+        step = self.quantization
+        if not step:
+            return latitude, longitude
+        return round(round(latitude / step) * step, 10), round(round(longitude / step) * step, 10)
+
+    def get(self, key):
+        """Return a private copy of a cached value, or None on a miss"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return clone(value)
+
+    def set(self, key, value):
+        """Cache a private copy of ``value``"""
+        if self.max_size <= 0:
+            return
+        value = clone(value)
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop all entries and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """Snapshot of the cache counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "quantization": self.quantization,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,386 @@
+"""Precomputed, memory-mapped ephemeris table.
+
+The table stores the apparent geocentric RA/Dec and earth distance of the
+seven classical planets at a fixed step over a date range. Lookups interpolate
+between the two neighbouring rows and derive topocentric alt/az locally, which
+is much cheaper than a live ``ephem`` computation. The file is opened with
+``mmap`` so every worker process shares the same page-cache pages.
+
+Generate a table and compare it against live ``ephem`` output with:
+
+    python ephemeris_table.py generate --start-year 1900 --end-year 2100 -o ephemeris.bin
+    python ephemeris_table.py compare ephemeris.bin --samples 2000
+"""
+
+import argparse
+import math
+import mmap
+import os
+import random
+import struct
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import ephem
+
+MAGIC = b"ASTEPH01"
+# magic, start (ephem days), step (days), step count, body count, values per body
+HEADER = struct.Struct("<8sddIII")
+HEADER_SIZE = 64
+
+BODIES = ("Sun", "Moon", "Mercury", "Venus", "Mars", "Jupiter", "Saturn")
+VALUES_PER_BODY = 3  # ra, dec, earth distance (AU)
+
+# ephem dates count days from 1899-12-31 12:00 UTC
+EPHEM_EPOCH = datetime(1899, 12, 31, 12, 0)
+DUBLIN_JD_OFFSET = 2415020.0
+TWO_PI = 2 * math.pi
+# Sine of the equatorial horizontal parallax of a body at 1 AU (8.794")
+SIN_PARALLAX_1AU = math.sin(math.radians(8.794 / 3600))
+# ephem's default observer atmosphere, used for refraction
+PRESSURE = 1010.0
+TEMPERATURE = 15.0
+REFRACTION_TOLERANCE = math.radians(0.1 / 3600)
+
+
+def to_ephem_days(moment):
+    """Convert a naive UTC datetime to ephem's day count"""
+    return (moment - EPHEM_EPOCH).total_seconds() / 86400.0
+
+
+def _make_bodies():
+    return [ephem.Sun(), ephem.Moon(), ephem.Mercury(), ephem.Venus(),
+            ephem.Mars(), ephem.Jupiter(), ephem.Saturn()]
+
+
+def _compute_rows(start, step, first, count):
+    """Compute ``count`` table rows starting at row index ``first``"""
+    bodies = _make_bodies()
+    values = array("f")
+    for row in range(first, first + count):
+        date = ephem.Date(start + row * step)
+        for body in bodies:
+            body.compute(date)
+            values.append(float(body.g_ra))
+            values.append(float(body.g_dec))
+            values.append(float(body.earth_distance))
+    return values.tobytes()
+
+
+class EphemerisTable:
+    """Read-only, memory-mapped ephemeris table with linear interpolation"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, start, step, steps, bodies, per_body = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not an ephemeris table")
+        if bodies != len(BODIES) or per_body != VALUES_PER_BODY:
+            self.close()
+            raise ValueError(f"{path} has an unsupported layout")
+
+        self.start = start
+        self.step = step
+        self.steps = steps
+        self.end = start + step * (steps - 1)
+        self._row_width = bodies * per_body
+        self._values = memoryview(self._mmap)[HEADER_SIZE:].cast("f")
+
+    def close(self):
+        """Release the memory map and file handle"""
+        values = getattr(self, "_values", None)
+        if values is not None:
+            values.release()
+            self._values = None
+        if getattr(self, "_mmap", None) is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+    def covers(self, days):
+        """Whether an ephem day count falls inside the table"""
+        return self.start <= days <= self.end
+
+    def positions(self, birth_date, latitude, longitude):
+        """Interpolated positions in the shape of ``get_planetary_positions``.
+
+        Returns None when ``birth_date`` is outside the covered range so the
+        caller can fall back to a live ``ephem`` computation.
+        """
+        days = to_ephem_days(birth_date)
+        if not self.covers(days):
+            return None
+
+        offset = (days - self.start) / self.step
+        row = min(int(offset), self.steps - 2)
+        fraction = offset - row
+        values = self._values
+        base = row * self._row_width
+        next_base = base + self._row_width
+
+        lat = math.radians(latitude)
+        sin_lat, cos_lat = math.sin(lat), math.cos(lat)
+        # Observer's geocentric position on the reference ellipsoid (Meeus 11)
+        u = math.atan(0.99664719 * math.tan(lat))
+        rho_sin_lat = 0.99664719 * math.sin(u)
+        rho_cos_lat = math.cos(u)
+        sidereal = _local_sidereal_time(days, longitude)
+
+        positions = {}
+        for index, name in enumerate(BODIES):
+            i = base + index * VALUES_PER_BODY
+            j = next_base + index * VALUES_PER_BODY
+
+            ra0, ra1 = values[i], values[j]
+            if ra1 - ra0 > math.pi:
+                ra1 -= TWO_PI
+            elif ra0 - ra1 > math.pi:
+                ra1 += TWO_PI
+            ra = ra0 + (ra1 - ra0) * fraction
+            dec = values[i + 1] + (values[j + 1] - values[i + 1]) * fraction
+            distance = values[i + 2] + (values[j + 2] - values[i + 2]) * fraction
+
+            # Topocentric parallax correction (Meeus 40), mostly for the Moon
+            sin_parallax = SIN_PARALLAX_1AU / distance
+            hour_angle = sidereal - ra
+            cos_dec = math.cos(dec)
+            denominator = cos_dec - rho_cos_lat * sin_parallax * math.cos(hour_angle)
+            delta_ra = math.atan2(-rho_cos_lat * sin_parallax * math.sin(hour_angle), denominator)
+            dec = math.atan2((math.sin(dec) - rho_sin_lat * sin_parallax) * math.cos(delta_ra),
+                             denominator)
+            ra = (ra + delta_ra) % TWO_PI
+            hour_angle -= delta_ra
+
+            sin_dec, cos_dec = math.sin(dec), math.cos(dec)
+            cos_hour_angle = math.cos(hour_angle)
+            alt = math.asin(sin_lat * sin_dec + cos_lat * cos_dec * cos_hour_angle)
+            az = math.atan2(-cos_dec * math.sin(hour_angle),
+                            sin_dec * cos_lat - cos_dec * sin_lat * cos_hour_angle) % TWO_PI
+
+            positions[name] = {
+                "ra": ra,
+                "dec": dec,
+                "alt": _refract(alt),
+                "az": az
+            }
+
+        return positions
+
+    @classmethod
+    def generate(cls, path, start, end, step_hours=1.0, workers=None, progress=None):
+        """Write a table covering ``start``..``end`` (naive UTC datetimes)"""
+        start_days = to_ephem_days(start)
+        step = step_hours / 24.0
+        steps = int(math.floor((to_ephem_days(end) - start_days) / step)) + 1
+        if steps < 2:
+            raise ValueError("The table must cover at least two steps")
+
+        chunk = max(1, int(round(24 * 30 / step_hours)))  # about a month of rows
+        chunks = [(first, min(chunk, steps - first)) for first in range(0, steps, chunk)]
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as out:
+            header = HEADER.pack(MAGIC, start_days, step, steps, len(BODIES), VALUES_PER_BODY)
+            out.write(header.ljust(HEADER_SIZE, b"\0"))
+
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = executor.map(_compute_rows,
+                                       [start_days] * len(chunks), [step] * len(chunks),
+                                       [first for first, _ in chunks],
+                                       [count for _, count in chunks])
+                done = 0
+                for (first, count), data in zip(chunks, results):
+                    out.write(data)
+                    done += count
+                    if progress:
+                        progress(done, steps)
+
+        os.replace(tmp_path, path)
+        return steps
+
+
+def _local_sidereal_time(days, longitude):
+    """Local apparent sidereal time in radians for an ephem day count (Meeus 12, 22)"""
+    jd = days + DUBLIN_JD_OFFSET
+    t = (jd - 2451545.0) / 36525.0
+    gmst = (280.46061837 + 360.98564736629 * (jd - 2451545.0)
+            + t * t * (0.000387933 - t / 38710000.0))
+
+    # Equation of the equinoxes from the low-precision nutation in longitude
+    node = math.radians(125.04452 - 1934.136261 * t)
+    sun = math.radians(280.4665 + 36000.7698 * t)
+    moon = math.radians(218.3165 + 481267.8813 * t)
+    nutation = (-17.20 * math.sin(node) - 1.32 * math.sin(2 * sun)
+                - 0.23 * math.sin(2 * moon) + 0.21 * math.sin(2 * node))
+    equation_of_equinoxes = nutation * math.cos(math.radians(23.4393)) / 3600.0
+
+    return math.radians((gmst + equation_of_equinoxes + longitude) % 360.0)
+
+
+def _unrefract(alt):
+    """Apparent to true altitude, using libastro's blended low/high formulas"""
+    degrees = math.degrees(alt)
+    if degrees < 15.5:
+        a = ((2e-5 * degrees + 1.96e-2) * degrees + 1.594e-1) * PRESSURE
+        b = (273 + TEMPERATURE) * ((8.45e-2 * degrees + 5.05e-1) * degrees + 1)
+        correction = math.radians(a / b)
+        low = alt if (alt < 0 and correction < 0) else alt - correction
+        if degrees < 14.5:
+            return low
+    high = alt - 7.888888e-5 * PRESSURE / ((273 + TEMPERATURE) * math.tan(alt))
+    if degrees >= 15.5:
+        return high
+    return low + (high - low) * (degrees - 14.5)
+
+
+def _refract(alt):
+    """True to apparent altitude, inverting ``_unrefract`` by the secant method"""
+    true_alt = _unrefract(alt)
+    delta = 0.8 * (alt - true_alt)
+    apparent = alt
+    for _ in range(8):
+        apparent += delta
+        previous = true_alt
+        true_alt = _unrefract(apparent)
+        if true_alt == previous:
+            break
+        delta *= -(true_alt - alt) / (true_alt - previous)
+        if abs(alt - true_alt) <= REFRACTION_TOLERANCE:
+            break
+    return apparent
+
+
+def _live_positions(observer, bodies, moment, latitude, longitude):
+    observer.lat = str(latitude)
+    observer.lon = str(longitude)
+    observer.date = moment
+    positions = {}
+    for body, name in zip(bodies, BODIES):
+        body.compute(observer)
+        positions[name] = {
+            "ra": float(body.ra),
+            "dec": float(body.dec),
+            "alt": float(body.alt),
+            "az": float(body.az)
+        }
+    return positions
+
+
+def _separation(ra1, dec1, ra2, dec2):
+    """Angular separation in arcseconds"""
+    cos_sep = (math.sin(dec1) * math.sin(dec2)
+               + math.cos(dec1) * math.cos(dec2) * math.cos(ra1 - ra2))
+    return math.degrees(math.acos(max(-1.0, min(1.0, cos_sep)))) * 3600
+
+
+def compare(table, samples=1000, seed=0):
+    """Compare the table against live ephem for random dates and places"""
+    rng = random.Random(seed)
+    start = EPHEM_EPOCH + timedelta(days=table.start)
+    span = (table.end - table.start) * 86400
+    cases = []
+    for _ in range(samples):
+        moment = start + timedelta(seconds=rng.uniform(0, span))
+        cases.append((moment.replace(microsecond=0),
+                      round(rng.uniform(-66, 66), 4), round(rng.uniform(-180, 180), 4)))
+
+    observer = ephem.Observer()
+    bodies = _make_bodies()
+
+    began = time.perf_counter()
+    live = [_live_positions(observer, bodies, *case) for case in cases]
+    live_seconds = time.perf_counter() - began
+
+    began = time.perf_counter()
+    interpolated = [table.positions(*case) for case in cases]
+    table_seconds = time.perf_counter() - began
+
+    errors = {name: {"radec": [], "altaz": []} for name in BODIES}
+    for expected, actual in zip(live, interpolated):
+        for name in BODIES:
+            e, a = expected[name], actual[name]
+            errors[name]["radec"].append(_separation(e["ra"], e["dec"], a["ra"], a["dec"]))
+            errors[name]["altaz"].append(_separation(e["az"], e["alt"], a["az"], a["alt"]))
+
+    return {
+        "samples": samples,
+        "live_us_per_chart": live_seconds / samples * 1e6,
+        "table_us_per_chart": table_seconds / samples * 1e6,
+        "errors_arcsec": {
+            name: {
+                kind: {
+                    "mean": sum(values) / len(values),
+                    "max": max(values)
+                }
+                for kind, values in kinds.items()
+            }
+            for name, kinds in errors.items()
+        }
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or check a precomputed ephemeris table")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate_parser = commands.add_parser("generate", help="Generate a table file")
+    generate_parser.add_argument("-o", "--output", required=True, help="Output file path")
+    generate_parser.add_argument("--start-year", type=int, default=1900)
+    generate_parser.add_argument("--end-year", type=int, default=2100,
+                                 help="Last year covered (inclusive)")
+    generate_parser.add_argument("--step-hours", type=float, default=1.0)
+    generate_parser.add_argument("--workers", type=int, default=None,
+                                 help="Worker processes (default: CPU count)")
+
+    compare_parser = commands.add_parser("compare", help="Compare a table against live ephem")
+    compare_parser.add_argument("table", help="Table file path")
+    compare_parser.add_argument("--samples", type=int, default=1000)
+    compare_parser.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        def progress(done, total):
+            sys.stderr.write(f"\r{done}/{total} steps ({done * 100 // total}%)")
+            sys.stderr.flush()
+
+        began = time.perf_counter()
+        steps = EphemerisTable.generate(
+            args.output,
+            datetime(args.start_year, 1, 1),
+            datetime(args.end_year + 1, 1, 1),
+            step_hours=args.step_hours,
+            workers=args.workers,
+            progress=progress
+        )
+        sys.stderr.write("\n")
+        size = os.path.getsize(args.output)
+        print(f"Wrote {steps} steps ({size / 1e6:.1f} MB) to {args.output} "
+              f"in {time.perf_counter() - began:.1f}s")
+        return 0
+
+    table = EphemerisTable(args.table)
+    try:
+        report = compare(table, samples=args.samples, seed=args.seed)
+    finally:
+        table.close()
+
+    print(f"Samples: {report['samples']}")
+    print(f"Live ephem:  {report['live_us_per_chart']:8.1f} us/chart")
+    print(f"Table:       {report['table_us_per_chart']:8.1f} us/chart")
+    print(f"{'Body':<10}{'RA/Dec mean':>14}{'RA/Dec max':>14}{'Alt/Az mean':>14}{'Alt/Az max':>14}")
+    for name, kinds in report["errors_arcsec"].items():
+        print(f"{name:<10}{kinds['radec']['mean']:>13.2f}\"{kinds['radec']['max']:>13.2f}\""
+              f"{kinds['altaz']['mean']:>13.2f}\"{kinds['altaz']['max']:>13.2f}\"")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
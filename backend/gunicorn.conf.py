@@ -0,0 +1,59 @@
+"""Gunicorn settings: preload the app once, then warm up each worker.
+
+The master imports ``app`` before forking, so the engine's static tables,
+the encoded static responses and prediction templates, the timezone grid and
+any memory-mapped ephemeris table are built once and shared copy-on-write by
+every worker. Each worker then runs ``app.warm_up`` before it accepts
+requests; ``/api/health`` answers 503 until it has. Unless ``METRICS_DIR`` is
+set, the workers share a fresh temporary metrics directory, removed again
+when the server exits, so ``/api/metrics`` reports totals for the whole server.
+Run with:
+
+    gunicorn -c gunicorn.conf.py app:app
+"""
+
+import gc
+import os
+import shutil
+import tempfile
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', 4))
+# The app sizes each worker's batch pool from this
+os.environ['WEB_CONCURRENCY'] = str(workers)
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True') == 'True'
+
+# Set before the app is imported, so the master and every worker see it
+owned_metrics_dir = None
+if not os.getenv('METRICS_DIR'):
+    owned_metrics_dir = os.environ['METRICS_DIR'] = tempfile.mkdtemp(prefix='astro-metrics-')
+
+
+def when_ready(server):
+    if preload_app:
+        from app import startup_timings
+        server.log.info("App preloaded: %s", format_timings(startup_timings))
+
+
+def pre_fork(server, worker):
+    # Keep the preloaded objects out of the collector's reach: collections
+    # in a worker would otherwise write to, and so copy, their shared pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    if not preload_app:
+        return
+    from app import startup_timings, warm_up
+    warm_up()
+    server.log.info("Worker %s warmed up in %.1fms", worker.pid, startup_timings.get('warm_up', 0) * 1000)
+
+
+def on_exit(server):
+    if owned_metrics_dir:
+        shutil.rmtree(owned_metrics_dir, ignore_errors=True)
+
+
+def format_timings(timings):
+    return ", ".join(f"{stage} {seconds * 1000:.1f}ms" for stage, seconds in timings.items())
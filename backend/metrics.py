@@ -0,0 +1,391 @@
+"""Low-overhead in-process metrics with Prometheus text exposition.
+
+Counters, gauges and histograms live in plain dicts guarded by one lock, so
+recording a sample costs a lock, a bisect and a few increments. When
+``METRICS_DIR`` is set, every process periodically writes its snapshot there
+and the exposition merges all snapshots, so a scrape of any gunicorn worker
+reports totals for the whole server: counters and histograms are summed over
+all files, gauges only over processes that are still alive. Snapshots of
+processes that have exited are folded into a retained-totals file, so
+counters never go backwards when workers are replaced.
+"""
+
+import atexit
+import functools
+import json
+import os
+import secrets
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: snapshots are merged but never folded
+    fcntl = None
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+RETAINED_FILE = "retained.json"
+
+
+class MetricsRegistry:
+    """Process-wide registry of counters, gauges and histograms"""
+
+    def __init__(self, directory=None, flush_interval=5.0, buckets=DEFAULT_BUCKETS):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.buckets = tuple(buckets)
+        self._help = {}
+        self._counters = {}
+        self._gauges = {}
+        # (name, labels) -> [count per bucket..., +Inf count, sum]
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._flusher_pid = None
+        self._paused = False
+        # Tells this process's snapshot apart from one left by an earlier
+        # process that had the same pid
+        self._token = secrets.token_hex(6)
+        self._started = time.time()
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # A forked child starts empty: the inherited samples belong to the parent
+        os.register_at_fork(after_in_child=self._reset)
+
+    def describe(self, name, kind, help_text):
+        """Register the TYPE and HELP lines for a metric"""
+        self._help[name] = (kind, help_text)
+
+    def inc(self, name, labels=(), amount=1):
+        """Increment a counter"""
+        if self._paused:
+            return
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+        self._ensure_flusher()
+
+    def add(self, name, labels=(), delta=1):
+        """Move a gauge up or down"""
+        if self._paused:
+            return
+        key = (name, labels)
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + delta
+        self._ensure_flusher()
+
+    def observe(self, name, labels, seconds):
+        """Record one histogram sample"""
+        if self._paused:
+            return
+        key = (name, labels)
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            values = self._histograms.get(key)
+            if values is None:
+                values = self._histograms[key] = [0] * (len(self.buckets) + 2)
+            values[index] += 1
+            values[-1] += seconds
+        self._ensure_flusher()
+
+    @contextmanager
+    def stage(self, stage_name):
+        """Time a block of the request path as one stage"""
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("astro_stage_duration_seconds", (("stage", stage_name),),
+                         time.perf_counter() - began)
+
+    @contextmanager
+    def paused(self):
+        """Record nothing inside the block, for startup work done before serving"""
+        self._paused = True
+        try:
+            yield
+        finally:
+            self._paused = False
+
+    def timed(self, function_name, func):
+        """Wrap ``func`` so each call is recorded under ``function_name``"""
+        labels = (("function", function_name),)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            began = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.observe("astro_engine_duration_seconds", labels, time.perf_counter() - began)
+
+        return wrapper
+
+    def instrument(self, obj, method_names):
+        """Replace bound methods of ``obj`` with timed wrappers"""
+        for method_name in method_names:
+            setattr(obj, method_name, self.timed(method_name.lstrip("_"), getattr(obj, method_name)))
+
+    def snapshot(self):
+        """JSON-serializable copy of this process's metrics"""
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "token": self._token,
+                "started": self._started,
+                "counters": [[name, labels, value] for (name, labels), value in self._counters.items()],
+                "gauges": [[name, labels, value] for (name, labels), value in self._gauges.items()],
+                "histograms": [[name, labels, list(values)]
+                               for (name, labels), values in self._histograms.items()],
+            }
+
+    def render(self):
+        """Prometheus text exposition, merged across processes when configured"""
+        counters, gauges, histograms = {}, {}, {}
+        for snapshot in self._collect():
+            _merge(snapshot, counters, gauges if snapshot.get("live", True) else None, histograms)
+
+        lines = []
+        lines.extend(self._render_simple("counter", counters))
+        lines.extend(self._render_simple("gauge", gauges))
+        lines.extend(self._render_histograms(histograms))
+        return "\n".join(lines) + "\n"
+
+    def flush(self):
+        """Write this process's snapshot to the shared directory"""
+        if not self.directory:
+            return
+        _write_json(os.path.join(self.directory, f"metrics-{os.getpid()}-{self._token}.json"),
+                    self.snapshot())
+
+    def _collect(self):
+        own = self.snapshot()
+        if not self.directory:
+            return [own]
+        with self._directory_lock():
+            retained = _read_json(os.path.join(self.directory, RETAINED_FILE)) or {
+                "counters": [], "gauges": [], "histograms": [], "folded": []}
+            retained["live"] = False
+            snapshots = {}
+            for filename in os.listdir(self.directory):
+                if not filename.startswith("metrics-") or not filename.endswith(".json"):
+                    continue
+                snapshot = _read_json(os.path.join(self.directory, filename))
+                if snapshot is not None and snapshot.get("token") != own["token"]:
+                    snapshots[filename] = snapshot
+
+            # A pid belongs to the newest process that reported it; older
+            # snapshots under the same pid are from processes that exited
+            newest = {own["pid"]: own["started"]}
+            for snapshot in snapshots.values():
+                pid = snapshot.get("pid")
+                newest[pid] = max(newest.get(pid, 0), snapshot.get("started", 0))
+            for snapshot in snapshots.values():
+                pid = snapshot.get("pid")
+                snapshot["live"] = (snapshot.get("started", 0) >= newest[pid]
+                                    and _process_alive(pid))
+
+            if fcntl is not None:
+                dead = [filename for filename, snapshot in snapshots.items() if not snapshot["live"]]
+                if dead or retained["folded"]:
+                    self._fold(retained, {filename: snapshots[filename] for filename in dead})
+                    snapshots = {filename: snapshot for filename, snapshot in snapshots.items()
+                                 if snapshot["live"]}
+        return [own, retained] + list(snapshots.values())
+
+    def _fold(self, retained, dead):
+        # Add exited processes' counters and histograms to the retained
+        # totals, then delete their files. Files already folded before an
+        # interrupted delete are listed in "folded" and only deleted again.
+        counters, histograms = {}, {}
+        _merge(retained, counters, None, histograms)
+        folded = set(retained["folded"])
+        for filename, snapshot in dead.items():
+            if filename not in folded:
+                _merge(snapshot, counters, None, histograms)
+        retained["counters"] = [[name, labels, value] for (name, labels), value in counters.items()]
+        retained["histograms"] = [[name, labels, values] for (name, labels), values in histograms.items()]
+        retained["folded"] = sorted(set(dead) | {filename for filename in folded
+                                                 if os.path.exists(os.path.join(self.directory, filename))})
+        _write_json(os.path.join(self.directory, RETAINED_FILE),
+                    {key: retained[key] for key in ("counters", "gauges", "histograms", "folded")})
+        for filename in dead:
+            try:
+                os.remove(os.path.join(self.directory, filename))
+            except FileNotFoundError:
+                pass
+        retained["folded"] = []
+
+    @contextmanager
+    def _directory_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directory, ".lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._flusher_pid = None
+        self._token = secrets.token_hex(6)
+        self._started = time.time()
+
+    def _ensure_flusher(self):
+        # One background flusher per process, started lazily so it survives fork
+        if not self.directory or self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_loop, name="metrics-flusher", daemon=True).start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError:
+                pass
+
+    def _header(self, name, kind):
+        kind, help_text = self._help.get(name, (kind, name))
+        return [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+
+    def _render_simple(self, kind, values):
+        lines = []
+        current = None
+        for (name, labels), value in sorted(values.items()):
+            if name != current:
+                lines.extend(self._header(name, kind))
+                current = name
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+    def _render_histograms(self, histograms):
+        lines = []
+        current = None
+        for (name, labels), values in sorted(histograms.items()):
+            if name != current:
+                lines.extend(self._header(name, "histogram"))
+                current = name
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', repr(bound)),))} {cumulative}")
+            cumulative += values[len(self.buckets)]
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(values[-1])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+def _merge(snapshot, counters, gauges, histograms):
+    """Add a snapshot's samples into the totals; gauges are skipped when None"""
+    for name, labels, value in snapshot["counters"]:
+        key = (name, _labels_tuple(labels))
+        counters[key] = counters.get(key, 0) + value
+    if gauges is not None:
+        for name, labels, value in snapshot["gauges"]:
+            key = (name, _labels_tuple(labels))
+            gauges[key] = gauges.get(key, 0) + value
+    for name, labels, values in snapshot["histograms"]:
+        key = (name, _labels_tuple(labels))
+        merged = histograms.get(key)
+        if merged is None or len(merged) != len(values):
+            histograms[key] = list(values)
+        else:
+            for index, value in enumerate(values):
+                merged[index] += value
+
+
+def _read_json(path):
+    try:
+        with open(path) as json_file:
+            return json.load(json_file)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, data):
+    # Readers only ever see a complete file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as out:
+        json.dump(data, out)
+    os.replace(tmp_path, path)
+
+
+def _labels_tuple(labels):
+    return tuple(tuple(pair) for pair in labels)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for key, value in labels
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _process_alive(pid):
+    if not isinstance(pid, int):
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _flush_at_exit(registry):
+    try:
+        registry.flush()
+    except OSError:
+        # The directory may already be gone, e.g. removed by gunicorn's on_exit
+        pass
+
+
+def create_registry():
+    """Registry configured from METRICS_DIR / METRICS_FLUSH_INTERVAL"""
+    registry = MetricsRegistry(
+        directory=os.getenv("METRICS_DIR") or None,
+        flush_interval=float(os.getenv("METRICS_FLUSH_INTERVAL", 5))
+    )
+    # Don't lose the samples recorded since the last periodic flush
+    atexit.register(_flush_at_exit, registry)
+    registry.describe("astro_http_requests_total", "counter", "HTTP requests by endpoint and status")
+    registry.describe("astro_http_errors_total", "counter",
+                      "HTTP responses with status >= 400 and unhandled exceptions")
+    registry.describe("astro_http_requests_in_flight", "gauge", "Requests currently being handled")
+    registry.describe("astro_http_request_duration_seconds", "histogram",
+                      "Time to produce a response, by endpoint")
+    registry.describe("astro_admission_rejected_total", "counter",
+                      "Engine-backed requests shed by rate limiting or admission control")
+    registry.describe("astro_admission_wait_seconds", "histogram",
+                      "Time engine-backed requests spent waiting for an admission slot")
+    registry.describe("astro_prediction_coalesced_total", "counter",
+                      "Predictions served from an identical in-flight request")
+    registry.describe("astro_stage_duration_seconds", "histogram",
+                      "Time spent in each stage of the prediction path")
+    registry.describe("astro_engine_duration_seconds", "histogram",
+                      "Time spent in AstrologyEngine functions")
+    return registry
@@ -0,0 +1,285 @@
+"""Storage backends for generated predictions.
+
+``SQLitePredictionStore`` keeps results in a local SQLite database shared by
+every worker process on the host, with a bounded in-memory LRU hot cache in
+front of it. Writes are queued and flushed in batches by a background thread,
+so storing a prediction never waits on disk I/O in the request path.
+"""
+
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread-safe LRU cache with a size cap and per-entry TTL"""
+
+    def __init__(self, max_size=1024, ttl=300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Insert or refresh a value, evicting the least recently used entries"""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class PredictionStore:
+    """Interface for prediction storage backends"""
+
+    def get(self, prediction_id):
+        """Return a stored prediction dict, or None if not found"""
+        raise NotImplementedError
+
+    def put(self, prediction_id, result):
+        """Store a prediction dict, or its JSON encoding as bytes; dicts must not be mutated afterwards"""
+        raise NotImplementedError
+
+    def close(self):
+        """Flush pending writes and release resources"""
+
+
+class MemoryPredictionStore(PredictionStore):
+    """Process-local store bounded by an LRU cache; suited to development"""
+
+    def __init__(self, cache_size=1024, cache_ttl=300.0):
+        self._cache = LRUCache(cache_size, cache_ttl)
+
+    def get(self, prediction_id):
+        return _decoded(self._cache.get(prediction_id))
+
+    def put(self, prediction_id, result):
+        self._cache.set(prediction_id, result)
+
+
+class SQLitePredictionStore(PredictionStore):
+    """SQLite-backed store shared across worker processes on one host"""
+
+    def __init__(self, path, cache_size=1024, cache_ttl=300.0, batch_size=100,
+                 flush_interval=0.05, queue_size=10000, retention=None):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # Seconds to keep rows on disk; None keeps them forever
+        self.retention = retention
+
+        self._cache = LRUCache(cache_size, cache_ttl)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._local = threading.local()
+        self._writer = None
+        self._writer_pid = None
+        self._writer_lock = threading.Lock()
+        self._last_prune = 0.0
+
+        connection = self._connect()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS predictions ("
+            "id TEXT PRIMARY KEY, created_at REAL NOT NULL, data BLOB NOT NULL)"
+        )
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS predictions_created_at ON predictions (created_at)"
+        )
+        connection.commit()
+        connection.close()
+
+    def get(self, prediction_id):
+        result = self._cache.get(prediction_id)
+        if result is not None:
+            return _decoded(result)
+
+        with self._pending_lock:
+            result = self._pending.get(prediction_id)
+        if result is not None:
+            return _decoded(result)
+
+        result = self._load(prediction_id)
+        if result is None:
+            # Another worker may still hold a just-created row in its write
+            # batch; wait out the rest of its flush, but never for old ids
+            wait = self._flush_wait(prediction_id)
+            if wait > 0:
+                time.sleep(wait)
+                result = self._load(prediction_id)
+        if result is not None:
+            self._cache.set(prediction_id, result)
+        return result
+
+    def put(self, prediction_id, result):
+        self._ensure_writer()
+        self._cache.set(prediction_id, result)
+        with self._pending_lock:
+            self._pending[prediction_id] = result
+        # Blocks only when the writer has fallen queue_size entries behind
+        self._queue.put((prediction_id, time.time(), result))
+
+    def close(self):
+        writer = self._writer
+        if writer is not None and writer.is_alive() and self._writer_pid == os.getpid():
+            self._queue.put(None)
+            writer.join()
+        self._writer = None
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute("PRAGMA busy_timeout=30000")
+        return connection
+
+    def _reader(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = self._connect()
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _load(self, prediction_id):
+        row = self._reader().execute(
+            "SELECT data FROM predictions WHERE id = ?", (prediction_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return deserialize(row[0])
+
+    def _flush_wait(self, prediction_id):
+        # Ids end in their creation timestamp; allow one flush interval for
+        # the batch to fill and another for the write itself
+        try:
+            created_at = float(prediction_id.rpartition("_")[2])
+        except ValueError:
+            return 0.0
+        age = time.time() - created_at
+        if age < 0:
+            return 0.0
+        return max(0.0, 2 * self.flush_interval - age)
+
+    def _ensure_writer(self):
+        # Started lazily and per process so the store survives a fork
+        if self._writer is not None and self._writer_pid == os.getpid():
+            return
+        with self._writer_lock:
+            if self._writer is not None and self._writer_pid == os.getpid():
+                return
+            self._writer_pid = os.getpid()
+            self._writer = threading.Thread(
+                target=self._write_loop, name="prediction-store-writer", daemon=True
+            )
+            self._writer.start()
+
+    def _write_loop(self):
+        connection = self._connect()
+        running = True
+        while running:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    running = False
+                    break
+                batch.append(item)
+
+            self._write_batch(connection, batch)
+        connection.close()
+
+    def _write_batch(self, connection, batch):
+        rows = [(prediction_id, created_at, serialize(result))
+                for prediction_id, created_at, result in batch]
+        try:
+            with connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO predictions (id, created_at, data) VALUES (?, ?, ?)",
+                    rows
+                )
+                self._prune(connection)
+        except sqlite3.Error:
+            # Results stay in the hot cache; losing the durable copy must not
+            # kill the writer thread
+            pass
+        finally:
+            with self._pending_lock:
+                for prediction_id, _, _ in batch:
+                    self._pending.pop(prediction_id, None)
+
+    def _prune(self, connection):
+        now = time.time()
+        if self.retention is None or now - self._last_prune < 60:
+            return
+        self._last_prune = now
+        connection.execute("DELETE FROM predictions WHERE created_at < ?", (now - self.retention,))
+
+
+def serialize(result):
+    """Encode a prediction as compact, compressed JSON"""
+    if isinstance(result, bytes):
+        return zlib.compress(result)
+    payload = json.dumps(result, separators=(",", ":"), ensure_ascii=False)
+    return zlib.compress(payload.encode("utf-8"))
+
+
+def _decoded(result):
+    """Prediction dict for a stored value, decoding results stored as JSON bytes"""
+    if isinstance(result, bytes):
+        return json.loads(result)
+    return result
+
+
+def deserialize(data):
+    """Decode a prediction written by ``serialize``"""
+    return json.loads(zlib.decompress(data).decode("utf-8"))
+
+
+def create_prediction_store(backend="sqlite", path="predictions.db", cache_size=1024,
+                            cache_ttl=300.0, retention=None):
+    """Build the configured prediction store and flush it on interpreter exit"""
+    if backend == "memory":
+        store = MemoryPredictionStore(cache_size=cache_size, cache_ttl=cache_ttl)
+    elif backend == "sqlite":
+        store = SQLitePredictionStore(path, cache_size=cache_size, cache_ttl=cache_ttl,
+                                      retention=retention)
+    else:
+        raise ValueError(f"Unknown prediction store backend: {backend}")
+
+    atexit.register(store.close)
+    return store
@@ -0,0 +1,220 @@
+"""Validation and assembly of prediction results, shared by the API and the bulk CLI.
+
+Nothing here depends on Flask, so the offline CLI and the batch pool's
+worker processes import only the engine and this module. The engine is
+configured from the environment:
+
+* ``EPHEMERIS_TABLE``: optional precomputed ephemeris table;
+* ``CHART_CACHE_SIZE`` / ``CHART_CACHE_QUANTIZATION``: the chart cache;
+* ``TIMEZONE_RESOLUTION`` / ``TIMEZONE_GRID``: birth-place timezone lookup.
+"""
+
+import math
+import os
+import time
+from contextlib import nullcontext
+from datetime import datetime
+
+import pytz
+
+from astrology_engine import AstrologyEngine
+from chart_cache import ChartCache
+from ephemeris_table import EphemerisTable
+from timezone_resolver import create_timezone_resolver
+
+# Sections a client can select with the fields/include parameter
+RESPONSE_FIELDS = AstrologyEngine.CHART_SECTIONS + ('predictions', 'advice')
+
+
+def create_astrology_engine():
+    """Engine configured from EPHEMERIS_TABLE / CHART_CACHE_* / TIMEZONE_*"""
+    # Optionally backed by a precomputed ephemeris table; birth times are
+    # local and converted to UTC through the offline timezone grid
+    ephemeris_table_path = os.getenv('EPHEMERIS_TABLE')
+    chart_cache_size = int(os.getenv('CHART_CACHE_SIZE', 10000))
+    return AstrologyEngine(
+        ephemeris_table=EphemerisTable(ephemeris_table_path) if ephemeris_table_path else None,
+        chart_cache=ChartCache(
+            max_size=chart_cache_size,
+            quantization=float(os.getenv('CHART_CACHE_QUANTIZATION', 0))
+        ) if chart_cache_size > 0 else None,
+        timezone_resolver=create_timezone_resolver()
+    )
+
+
+engine_started = time.perf_counter()
+astro_engine = create_astrology_engine()
+engine_build_seconds = time.perf_counter() - engine_started
+
+# Times the stages of build_prediction; the API points it at its metrics registry
+_stage_timer = None
+
+
+def time_stages(timer):
+    """Record build_prediction's stages with ``timer(stage_name)``, a context manager"""
+    global _stage_timer
+    _stage_timer = timer
+
+
+def stage(stage_name):
+    return nullcontext() if _stage_timer is None else _stage_timer(stage_name)
+
+
+def parse_prediction_input(data, default_fields=None):
+    """Validate a prediction payload, returning (params, error message)"""
+    if not isinstance(data, dict):
+        return None, "Request body must be a JSON object"
+
+    fields, error = parse_fields(data.get('fields', data.get('include', default_fields)))
+    if error:
+        return None, error
+
+    required_fields = ['name', 'birth_date', 'birth_time', 'latitude', 'longitude', 'gender']
+    for field in required_fields:
+        if field not in data:
+            return None, f"Missing field: {field}"
+
+    try:
+        name = data.get('name', '').strip()
+        birth_date_str = data.get('birth_date')  # Format: YYYY-MM-DD
+        birth_time_str = data.get('birth_time')  # Format: HH:MM
+        latitude = float(data.get('latitude'))
+        longitude = float(data.get('longitude'))
+        gender = data.get('gender', '').strip()
+    except (AttributeError, TypeError, ValueError) as e:
+        return None, f"Invalid input: {str(e)}"
+
+    # Validate input data
+    if not name or len(name) < 2:
+        return None, "Name must be at least 2 characters"
+
+    if gender not in ['Male', 'Female', 'Other']:
+        return None, "Gender must be Male, Female, or Other"
+
+    # Parse datetime
+    try:
+        birth_datetime = datetime.strptime(f"{birth_date_str} {birth_time_str}", "%Y-%m-%d %H:%M")
+    except ValueError:
+        return None, "Invalid date or time format. Use YYYY-MM-DD and HH:MM"
+
+    # Validate coordinates; NaN would pass the range check
+    if not (math.isfinite(latitude) and math.isfinite(longitude)):
+        return None, "Invalid latitude or longitude"
+    if latitude < -90 or latitude > 90 or longitude < -180 or longitude > 180:
+        return None, "Invalid latitude or longitude"
+
+    # Birth time is local to the birth place unless an explicit zone is given
+    timezone = data.get('timezone')
+    if timezone is not None and (not isinstance(timezone, str) or timezone not in pytz.all_timezones_set):
+        return None, f"Unknown timezone: {timezone}"
+    try:
+        timezone, birth_datetime_utc = astro_engine.resolve_birth_time(
+            birth_datetime, latitude, longitude, timezone)
+    except (OverflowError, ValueError):
+        # Dates at the ends of the datetime range can't be shifted to UTC
+        return None, "Invalid date or time"
+
+    params = {
+        "name": name,
+        "birth_datetime": birth_datetime,
+        "birth_datetime_utc": birth_datetime_utc,
+        "timezone": timezone,
+        "latitude": latitude,
+        "longitude": longitude,
+        "gender": gender,
+        "fields": fields,
+    }
+    return params, None
+
+
+def parse_fields(value):
+    """Parse a fields/include selection, returning (sorted tuple or None, error message)"""
+    if value is None:
+        return None, None
+    if isinstance(value, str):
+        value = [field.strip() for field in value.split(',') if field.strip()]
+    if not isinstance(value, list) or not all(isinstance(field, str) for field in value):
+        return None, "Fields must be a list or a comma-separated string"
+
+    unknown = [field for field in value if field not in RESPONSE_FIELDS]
+    if unknown:
+        return None, f"Unknown fields: {', '.join(unknown)}. Valid fields: {', '.join(RESPONSE_FIELDS)}"
+    return tuple(sorted(set(value))), None
+
+
+def prediction_key(params):
+    """Normalized, hashable form of validated prediction input"""
+    return (
+        params['name'],
+        params['birth_datetime'],
+        params['latitude'],
+        params['longitude'],
+        params['gender'],
+        params['timezone'],
+        params.get('fields'),
+    )
+
+
+def build_prediction(params):
+    """Compute the prediction result for validated input, limited to the requested fields"""
+    birth_datetime = params['birth_datetime']
+    gender = params['gender']
+    fields = params.get('fields')
+
+    # Generate birth chart analysis
+    with stage('chart'):
+        birth_chart = astro_engine.generate_birth_chart_analysis(
+            params['name'], birth_datetime, params['latitude'], params['longitude'], gender,
+            fields=fields, timezone=params['timezone']
+        )
+
+    result = {
+        "success": True,
+        "birth_chart": birth_chart,
+    }
+
+    # Generate life predictions
+    predictions = None
+    if fields is None or 'predictions' in fields:
+        with stage('predictions'):
+            predictions = astro_engine.generate_life_prediction(birth_datetime, gender)
+        result['predictions'] = predictions
+
+    if fields is None or 'advice' in fields:
+        with stage('advice'):
+            # Advice only needs the sign, life path and phase, so avoid the full sections
+            advice_chart = birth_chart
+            if 'sun_sign' not in birth_chart or 'life_path_number' not in birth_chart:
+                advice_chart = {
+                    "sun_sign": astro_engine.get_sun_sign(birth_datetime),
+                    "life_path_number": astro_engine.calculate_life_path_number(birth_datetime),
+                }
+            if predictions is None:
+                predictions = {"current_life_phase": astro_engine.get_life_phase(birth_datetime)[1]}
+            result['advice'] = get_personalized_advice(advice_chart, predictions, gender)
+
+    return result
+
+
+def compute_positions(params_list):
+    """Planetary positions for a list of validated inputs (runs in batch workers)"""
+    return [astro_engine.get_planetary_positions(params['birth_datetime_utc'], params['latitude'], params['longitude'])
+            for params in params_list]
+
+
+def get_personalized_advice(birth_chart, predictions, gender):
+    """Generate personalized advice based on analysis"""
+    sun_sign = birth_chart['sun_sign']['name']
+    current_phase = predictions['current_life_phase']
+    life_path = birth_chart['life_path_number']
+
+    advice = {
+        "career": f"As a {sun_sign}, you excel in roles that allow you to express your natural strengths.",
+        "relationships": f"Your {sun_sign} nature brings unique qualities to relationships. Focus on understanding your partner's needs.",
+        "health": "Maintain physical activity, manage stress through meditation or yoga, and ensure adequate sleep.",
+        "finances": f"Your life path number {life_path} suggests success through disciplined planning and strategic investments.",
+        "spiritual": "Explore meditation, journaling, or spiritual practices that resonate with your inner self.",
+        "general": f"You are in your {current_phase} phase. Focus on meaningful growth and positive relationships."
+    }
+
+    return advice
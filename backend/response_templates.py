@@ -0,0 +1,78 @@
+"""Pre-encoded JSON responses with slots for the per-request values.
+
+A template is a JSON document encoded once, with placeholder tokens in place
+of the values that change between requests. Rendering joins the pre-encoded
+byte segments with the encoded values, so the invariant bulk of a response
+is never rebuilt or re-encoded. Two kinds of slot are supported:
+
+* value slots: a whole JSON value, written as the string ``value_slot(name)``
+  and replaced by the JSON encoding of the value, or by the value itself when
+  it is bytes holding JSON encoded in advance;
+* text slots: a number inside a string, produced by formatting a ``Slot``
+  (e.g. ``f"age {Slot('age')}"``) and replaced by the number plus any offset
+  added to the slot (``Slot('age') + 10``).
+"""
+
+import re
+
+_TOKEN = re.compile(rb'"@@(\w+)@@"|@@(\w+)([+-]\d+)@@')
+
+
+def value_slot(name):
+    """Placeholder for a whole JSON value"""
+    return f"@@{name}@@"
+
+
+class Slot:
+    """Placeholder for an integer formatted into a string"""
+
+    def __init__(self, name, offset=0):
+        self.name = name
+        self.offset = offset
+
+    def __add__(self, other):
+        return Slot(self.name, self.offset + other)
+
+    __radd__ = __add__
+
+    def __format__(self, spec):
+        return f"@@{self.name}{self.offset:+d}@@"
+
+    def __str__(self):
+        return format(self)
+
+
+class ResponseTemplate:
+    """An encoded JSON document split around its slots"""
+
+    def __init__(self, encoded, dumps):
+        # Alternating literal bytes and (kind, name, offset) slot entries
+        self.parts = []
+        self.dumps = dumps
+        position = 0
+        for match in _TOKEN.finditer(encoded):
+            self.parts.append(encoded[position:match.start()])
+            if match.group(1) is not None:
+                self.parts.append(("value", match.group(1).decode("ascii"), 0))
+            else:
+                self.parts.append(("text", match.group(2).decode("ascii"), int(match.group(3))))
+            position = match.end()
+        self.parts.append(encoded[position:])
+
+    def slots(self):
+        """Names of every slot in the template"""
+        return {part[1] for part in self.parts if isinstance(part, tuple)}
+
+    def render(self, values):
+        """Encoded document with every slot filled from ``values``"""
+        dumps = self.dumps
+        chunks = []
+        for part in self.parts:
+            if part.__class__ is bytes:
+                chunks.append(part)
+            elif part[0] == "value":
+                value = values[part[1]]
+                chunks.append(value if value.__class__ is bytes else dumps(value).encode("utf-8"))
+            else:
+                chunks.append(str(values[part[1]] + part[2]).encode("ascii"))
+        return b"".join(chunks)
@@ -0,0 +1,71 @@
+"""Single-flight coalescing of identical in-flight computations.
+
+While one caller (the leader) computes the result for a key, other callers
+with the same key wait for it instead of starting their own computation.
+Errors raised by the leader propagate to every waiter. If the leader is
+interrupted by a non-``Exception`` (e.g. ``SystemExit`` or a worker being
+torn down), waiters retry and one of them becomes the new leader.
+"""
+
+import threading
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Thread-safe coalescing of concurrent calls that share a key"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args, timeout=None):
+        """Run ``func(*args)`` once per key among concurrent callers.
+
+        Returns ``(result, shared)``; ``shared`` is True for callers that
+        received another caller's result and must not mutate it in place.
+        A waiter that gives up after ``timeout`` seconds raises TimeoutError
+        without affecting the leader or the other waiters.
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+
+            if leader:
+                return self._lead(key, call, func, args), False
+
+            if not call.event.wait(timeout):
+                raise TimeoutError("Timed out waiting for an identical in-flight request")
+
+            if call.error is None:
+                return call.result, True
+            if isinstance(call.error, Exception):
+                raise call.error
+            # The leader was cancelled rather than failing; compute again
+
+    def in_flight(self):
+        """Number of keys currently being computed"""
+        with self._lock:
+            return len(self._calls)
+
+    def _lead(self, key, call, func, args):
+        try:
+            call.result = func(*args)
+            return call.result
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
@@ -0,0 +1,9 @@
+"""Start of the app's cold start, for the timings reported by /api/health.
+
+``app`` imports this module before anything else, so ``IMPORT_STARTED`` is
+taken before Flask, numpy and the engine are loaded.
+"""
+
+import time
+
+IMPORT_STARTED = time.perf_counter()
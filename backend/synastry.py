@@ -0,0 +1,144 @@
+"""Vectorized group compatibility (synastry) scoring.
+
+Every person is reduced to a sun-sign index, an element index and a unit
+vector per planet. Pairwise scores for a group are then built from whole-array
+operations: sign compatibility and element harmony by fancy-indexing small
+lookup tables, and planetary aspects from angular separations computed as one
+matrix product per planet pair. Rows are scored in blocks so memory stays at
+``block_size x N`` even for groups of several thousand people.
+"""
+
+import numpy as np
+
+ELEMENT_ORDER = ("Fire", "Earth", "Air", "Water")
+
+# Same element harmonizes fully, the classical complementary pairs
+# (Fire/Air, Earth/Water) well, and the rest weakly
+ELEMENT_HARMONY = np.array([
+    [1.0, 0.25, 0.75, 0.25],
+    [0.25, 1.0, 0.25, 0.75],
+    [0.75, 0.25, 1.0, 0.25],
+    [0.25, 0.75, 0.25, 1.0],
+], dtype=np.float32)
+
+# (planet of the first person, planet of the second person, weight); cross
+# pairs appear in both directions so the score matrix is symmetric
+PLANET_PAIRS = (
+    ("Sun", "Sun", 1.0),
+    ("Moon", "Moon", 1.0),
+    ("Sun", "Moon", 1.5),
+    ("Moon", "Sun", 1.5),
+    ("Venus", "Mars", 1.5),
+    ("Mars", "Venus", 1.5),
+    ("Venus", "Venus", 1.0),
+    ("Mercury", "Mercury", 0.5),
+)
+
+# (angle in degrees, orb in degrees, +1 harmonious / -1 tense)
+ASPECTS = (
+    (0.0, 8.0, 1.0),
+    (60.0, 6.0, 1.0),
+    (90.0, 8.0, -1.0),
+    (120.0, 8.0, 1.0),
+    (180.0, 8.0, -1.0),
+)
+
+# Contribution of each component to the 0-100 score
+SIGN_WEIGHT = 0.4
+ELEMENT_WEIGHT = 0.2
+ASPECT_WEIGHT = 0.4
+
+
+class SynastryGroup:
+    """Pairwise compatibility for a group of people with known charts"""
+
+    def __init__(self, sign_indexes, element_indexes, positions, compatibility_matrix, planet_names,
+                 block_size=512):
+        self.size = len(sign_indexes)
+        self.block_size = block_size
+        self.signs = np.asarray(sign_indexes, dtype=np.intp)
+        self.elements = np.asarray(element_indexes, dtype=np.intp)
+
+        compatibility = np.asarray(compatibility_matrix, dtype=np.float32)
+        # Mutual compatibility: half for each direction in which one sign lists the other
+        self.sign_table = (compatibility + compatibility.T) / 2
+
+        # vectors[p] is an (N, 3) array of unit vectors for planet p
+        planet_index = {name: index for index, name in enumerate(planet_names)}
+        ra = np.array([[person[name]["ra"] for name in planet_names] for person in positions],
+                      dtype=np.float64).reshape(self.size, len(planet_names))
+        dec = np.array([[person[name]["dec"] for name in planet_names] for person in positions],
+                       dtype=np.float64).reshape(self.size, len(planet_names))
+        cos_dec = np.cos(dec)
+        vectors = np.stack([cos_dec * np.cos(ra), cos_dec * np.sin(ra), np.sin(dec)], axis=-1)
+        self.vectors = [np.ascontiguousarray(vectors[:, index, :], dtype=np.float32)
+                        for index in range(len(planet_names))]
+        self.pairs = [(planet_index[first], planet_index[second], weight)
+                      for first, second, weight in PLANET_PAIRS]
+        self.pair_weight = sum(weight for _, _, weight in PLANET_PAIRS)
+
+    def score_rows(self, start, stop):
+        """Scores (0-100) of people ``start:stop`` against everyone, shape (stop - start, N)"""
+        signs = self.signs[start:stop, None]
+        elements = self.elements[start:stop, None]
+
+        sign_score = self.sign_table[signs, self.signs[None, :]]
+        element_score = ELEMENT_HARMONY[elements, self.elements[None, :]]
+
+        aspect_total = np.zeros((stop - start, self.size), dtype=np.float32)
+        for first, second, weight in self.pairs:
+            separation = self.vectors[first][start:stop] @ self.vectors[second].T
+            np.clip(separation, -1.0, 1.0, out=separation)
+            np.arccos(separation, out=separation)
+            # Look the aspect strength up at the nearest table step rather than
+            # evaluating every aspect's orb over the whole block
+            separation *= _ASPECT_TABLE_SCALE
+            separation += 0.5
+            aspect_total += weight * _ASPECT_TABLE[separation.astype(np.intp)]
+        # Map the weighted aspect balance from [-1, 1] onto [0, 1]
+        aspect_score = (aspect_total / self.pair_weight + 1) / 2
+
+        return 100 * (SIGN_WEIGHT * sign_score + ELEMENT_WEIGHT * element_score +
+                      ASPECT_WEIGHT * aspect_score)
+
+    def matrix(self):
+        """Full N x N score matrix; the diagonal is NaN"""
+        scores = np.empty((self.size, self.size), dtype=np.float32)
+        for start in range(0, self.size, self.block_size):
+            stop = min(start + self.block_size, self.size)
+            scores[start:stop] = self.score_rows(start, stop)
+        np.fill_diagonal(scores, np.nan)
+        return scores
+
+    def top_matches(self, k):
+        """(indexes, scores) of each person's ``k`` best matches, best first"""
+        k = min(k, self.size - 1)
+        indexes = np.empty((self.size, k), dtype=np.intp)
+        scores = np.empty((self.size, k), dtype=np.float32)
+        for start in range(0, self.size, self.block_size):
+            stop = min(start + self.block_size, self.size)
+            block = self.score_rows(start, stop)
+            rows = np.arange(stop - start)
+            # Never match someone with themselves
+            block[rows, rows + start] = -np.inf
+            best = np.argpartition(-block, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(block, best, axis=1)
+            order = np.argsort(-best_scores, axis=1, kind="stable")
+            indexes[start:stop] = np.take_along_axis(best, order, axis=1)
+            scores[start:stop] = np.take_along_axis(best_scores, order, axis=1)
+        return indexes, scores
+
+
+def aspect_strength(separation):
+    """Signed strength of the nearest major aspect for separations in degrees"""
+    strength = np.zeros_like(separation)
+    for angle, orb, polarity in ASPECTS:
+        strength += polarity * np.clip(1 - np.abs(separation - angle) / orb, 0, None)
+    return strength
+
+
+# aspect_strength sampled every ASPECT_TABLE_STEP degrees over 0-180
+ASPECT_TABLE_STEP = 0.05
+_ASPECT_TABLE = aspect_strength(np.arange(0, 180 + ASPECT_TABLE_STEP / 2, ASPECT_TABLE_STEP,
+                                          dtype=np.float32))
+_ASPECT_TABLE_SCALE = np.float32(1 / np.radians(ASPECT_TABLE_STEP))
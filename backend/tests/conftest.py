@@ -0,0 +1,11 @@
+import os
+import sys
+
+# Tests import the backend modules directly, as app.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep the app self-contained under test: no database file, and no per-client
+# or concurrency limits shedding the requests a test sends
+os.environ.setdefault("PREDICTION_STORE", "memory")
+os.environ.setdefault("RATE_LIMIT_PER_SECOND", "0")
+os.environ.setdefault("ADMISSION_MAX_CONCURRENT", "0")
@@ -0,0 +1,44 @@
+"""A response that arrives after its request timed out must still be closed."""
+
+import asyncio
+import threading
+
+from asgi_app import AsyncWSGIBridge
+
+
+class Body:
+    def __init__(self):
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        yield b'late'
+
+    def close(self):
+        self.closed.set()
+
+
+def test_late_streaming_response_is_closed():
+    body = Body()
+    release = threading.Event()
+
+    def slow_app(environ, start_response):
+        release.wait(5)
+        start_response('200 OK', [('Content-Type', 'application/x-ndjson')])
+        return body
+
+    bridge = AsyncWSGIBridge(slow_app, frozenset(), max_workers=1, timeout=0.05, max_pending=4)
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': 'GET', 'path': '/api/transits', 'headers': []}
+    asyncio.run(bridge(scope, receive, send))
+    assert sent[0]['status'] == 504
+
+    release.set()
+    assert body.closed.wait(5)
+    bridge.executor.shutdown()
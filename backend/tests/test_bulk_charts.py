@@ -0,0 +1,48 @@
+"""A malformed row must become a failed result line, never stop the job."""
+
+import json
+
+import bulk_charts
+
+GOOD = {"name": "Asha", "birth_date": "1990-05-01", "birth_time": "10:00",
+        "latitude": 28.61, "longitude": 77.21, "gender": "Female"}
+BAD_ROWS = [
+    dict(GOOD, latitude="nan"),
+    dict(GOOD, timezone=["UTC"]),
+    dict(GOOD, birth_date="9999-12-31", birth_time="23:59"),
+    [1, 2, 3],
+]
+
+
+def test_compute_chunk_reports_bad_rows():
+    data, records, failed = bulk_charts.compute_chunk(10, [GOOD] + BAD_ROWS, None)
+    results = [json.loads(line) for line in data.decode("utf-8").splitlines()]
+    assert records == 5
+    assert failed == 4
+    assert [result["index"] for result in results] == [10, 11, 12, 13, 14]
+    assert results[0]["success"] is True
+    assert all(result["success"] is False and result["error"] for result in results[1:])
+
+
+def test_compute_chunk_survives_validation_exceptions(monkeypatch):
+    def broken(record, default_fields=None):
+        raise RuntimeError("unexpected")
+
+    monkeypatch.setattr(bulk_charts, "parse_prediction_input", broken)
+    data, records, failed = bulk_charts.compute_chunk(0, [GOOD], None)
+    assert failed == 1
+    assert json.loads(data) == {"index": 0, "success": False, "error": "Server error: unexpected"}
+
+
+def test_run_writes_every_row(tmp_path):
+    source = tmp_path / "births.ndjson"
+    rows = [GOOD, BAD_ROWS[0], GOOD, BAD_ROWS[1]]
+    source.write_text("\n".join(json.dumps(row) for row in rows) + "\n{not json\n", encoding="utf-8")
+    output = tmp_path / "charts.ndjson"
+
+    total, failed = bulk_charts.run(str(source), str(output), "ndjson", str(tmp_path / "checkpoint"),
+                                    workers=1, chunk_size=2, progress_interval=3600)
+
+    results = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert (total, failed) == (5, 3)
+    assert [result["success"] for result in results] == [True, False, True, False, False]
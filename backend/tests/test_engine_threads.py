@@ -0,0 +1,68 @@
+"""Concurrency stress test: one engine shared by many threads must produce
+exactly what a single-threaded engine produces for the same charts."""
+
+import random
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from astrology_engine import AstrologyEngine
+from chart_cache import ChartCache
+
+THREADS = 8
+CHARTS = 60
+
+
+def random_charts(seed=0):
+    rng = random.Random(seed)
+    charts = []
+    for _ in range(CHARTS):
+        moment = datetime(1920, 1, 1) + timedelta(minutes=rng.randrange(0, 100 * 365 * 24 * 60))
+        charts.append((moment, round(rng.uniform(-60, 60), 4), round(rng.uniform(-180, 180), 4),
+                       rng.choice(["Male", "Female", "Other"])))
+    return charts
+
+
+def compute(engine, chart):
+    moment, latitude, longitude, gender = chart
+    return (
+        engine.generate_birth_chart_analysis("Stress Test", moment, latitude, longitude, gender),
+        engine.get_planetary_positions(moment, latitude, longitude),
+        engine.generate_life_prediction(moment, gender),
+    )
+
+
+@pytest.mark.parametrize("chart_cache", [None, ChartCache(max_size=CHARTS // 2)],
+                         ids=["uncached", "cached"])
+def test_threads_match_single_threaded_reference(chart_cache):
+    charts = random_charts()
+    reference_engine = AstrologyEngine()
+    expected = [compute(reference_engine, chart) for chart in charts]
+
+    shared_engine = AstrologyEngine(chart_cache=chart_cache)
+    barrier = threading.Barrier(THREADS)
+    failures = []
+
+    def worker(seed):
+        # Every thread walks all charts in its own order so the same charts
+        # are computed concurrently, and the cache keeps evicting
+        order = list(range(CHARTS))
+        random.Random(seed).shuffle(order)
+        barrier.wait()
+        for index in order * 2:
+            try:
+                result = compute(shared_engine, charts[index])
+            except Exception as error:
+                failures.append((index, repr(error)))
+                continue
+            if result != expected[index]:
+                failures.append((index, "result differs from the single-threaded reference"))
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert failures == []
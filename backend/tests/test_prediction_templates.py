@@ -0,0 +1,113 @@
+"""Templated /api/predict responses must be byte-identical to jsonify(build_prediction(...))."""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import app as app_module
+
+PHASE_BOUNDARIES = (18, 25, 50, 65)
+
+
+def payload(name="Template Test", birth=None, **overrides):
+    birth = birth or datetime(1990, 5, 5, 10, 30)
+    data = {
+        "name": name,
+        "birth_date": birth.strftime("%Y-%m-%d"),
+        "birth_time": birth.strftime("%H:%M"),
+        "latitude": 12.9716,
+        "longitude": 77.5946,
+        "gender": "Female",
+    }
+    data.update(overrides)
+    return data
+
+
+def born_days_ago(days):
+    # Half an hour of slack keeps the age at days // 365 for the whole test
+    return datetime.now() - timedelta(days=days, minutes=30)
+
+
+def boundary_cases():
+    for age in PHASE_BOUNDARIES:
+        yield pytest.param(born_days_ago(365 * age - 1), id=f"age-{age - 1}")
+        yield pytest.param(born_days_ago(365 * age), id=f"age-{age}")
+
+
+@pytest.fixture
+def client():
+    return app_module.app.test_client()
+
+
+def templated_response(client, monkeypatch, data):
+    """Response body from the template path, failing if the regular path runs"""
+    def regular_path(params):
+        raise AssertionError("request did not use a prediction template")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(app_module, "build_prediction", regular_path)
+        response = client.post('/api/predict', json=data)
+    assert response.status_code == 200
+    return response.get_data()
+
+
+def regular_response(data, prediction_id):
+    params, error = app_module.parse_prediction_input(data)
+    assert error is None
+    with app_module.app.app_context():
+        result = dict(app_module.build_prediction(params), prediction_id=prediction_id)
+        return app_module.jsonify(result).get_data()
+
+
+def assert_byte_identical(client, monkeypatch, data):
+    body = templated_response(client, monkeypatch, data)
+    prediction_id = app_module.app.json.loads(body)['prediction_id']
+    assert body == regular_response(data, prediction_id)
+
+
+def test_every_sign_and_phase_has_a_template():
+    signs = [sign['name'] for sign in app_module.astro_engine.ZODIAC_SIGNS]
+    phases = ["Childhood", "Young Adult", "Adult", "Middle Age", "Senior"]
+    assert set(app_module.PREDICTION_TEMPLATES) == {(sign, phase) for sign in signs for phase in phases}
+
+
+@pytest.mark.parametrize("name", [
+    "Zoë Ångström-Łukasz",
+    "名前 テスト",
+    'O\'Brien "The Quote"',
+    "Back\\slash </script>",
+])
+def test_names_are_encoded_like_jsonify(client, monkeypatch, name):
+    assert_byte_identical(client, monkeypatch, payload(name=name))
+
+
+@pytest.mark.parametrize("timezone", ["Asia/Kolkata", "America/New_York", "Etc/GMT+5"])
+def test_explicit_timezone(client, monkeypatch, timezone):
+    assert_byte_identical(client, monkeypatch, payload(timezone=timezone))
+
+
+def test_future_birth_date_with_negative_age(client, monkeypatch):
+    data = payload(birth=datetime.now() + timedelta(days=400))
+    body = templated_response(client, monkeypatch, data)
+    assert app_module.app.json.loads(body)['predictions']['current_age'] < 0
+    assert_byte_identical(client, monkeypatch, data)
+
+
+@pytest.mark.parametrize("birth", list(boundary_cases()))
+def test_ages_at_phase_boundaries(client, monkeypatch, birth):
+    assert_byte_identical(client, monkeypatch, payload(birth=birth))
+
+
+@pytest.mark.parametrize("month", range(1, 13))
+def test_every_month_and_gender(client, monkeypatch, month):
+    for gender in ("Male", "Female", "Other"):
+        data = payload(birth=datetime(1985, month, 14, 23, 59), gender=gender,
+                       latitude=-33.8688, longitude=151.2093)
+        assert_byte_identical(client, monkeypatch, data)
+
+
+def test_stored_prediction_matches_response(client, monkeypatch):
+    body = templated_response(client, monkeypatch, payload())
+    result = app_module.app.json.loads(body)
+    stored = client.get(f"/api/predictions/{result['prediction_id']}")
+    assert stored.get_json() == result
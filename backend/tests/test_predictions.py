@@ -0,0 +1,29 @@
+"""Malformed prediction input must come back as a validation error, never raise."""
+
+import pytest
+
+from predictions import parse_prediction_input
+
+VALID = {"name": "Asha", "birth_date": "1990-05-01", "birth_time": "10:00",
+         "latitude": 28.61, "longitude": 77.21, "gender": "Female"}
+
+
+def test_valid_input():
+    params, error = parse_prediction_input(VALID)
+    assert error is None
+    assert params["timezone"] == "Asia/Kolkata"
+
+
+@pytest.mark.parametrize("changes, message", [
+    ({"latitude": "nan"}, "Invalid latitude or longitude"),
+    ({"longitude": "inf"}, "Invalid latitude or longitude"),
+    ({"latitude": 91}, "Invalid latitude or longitude"),
+    ({"timezone": ["UTC"]}, "Unknown timezone: ['UTC']"),
+    ({"timezone": "Mars/Olympus_Mons"}, "Unknown timezone: Mars/Olympus_Mons"),
+    ({"birth_date": "0001-01-01", "birth_time": "00:00"}, "Invalid date or time"),
+    ({"birth_date": "9999-12-31", "birth_time": "23:59"}, "Invalid date or time"),
+])
+def test_invalid_input(changes, message):
+    params, error = parse_prediction_input(dict(VALID, **changes))
+    assert params is None
+    assert error == message
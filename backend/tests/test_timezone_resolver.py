@@ -0,0 +1,83 @@
+"""The bundled timezone grid must put birthplaces in their real zone, including
+places close to a zone border, and grid building must follow the polygons."""
+
+import pytest
+
+from timezone_resolver import GRID_PATH, TimezoneResolver, build_grid, create_timezone_resolver
+
+
+@pytest.fixture(scope="module")
+def bundled():
+    return TimezoneResolver(grid_path=GRID_PATH)
+
+
+def test_default_resolver_loads_bundled_grid(monkeypatch):
+    monkeypatch.delenv("TIMEZONE_GRID", raising=False)
+    monkeypatch.delenv("TIMEZONE_RESOLUTION", raising=False)
+    resolver = create_timezone_resolver()
+    assert resolver.resolution == 0.25
+    assert resolver.tile_size == 16
+    assert resolver.cells.count(0xFFFF) == 0
+
+
+def test_fill_matches_lazy_resolution():
+    filled = TimezoneResolver(resolution=5.0)
+    filled.fill()
+    lazy = TimezoneResolver(resolution=5.0)
+    for row in range(lazy.rows):
+        for column in range(lazy.columns):
+            latitude, longitude = lazy._cell_center(row, column)
+            assert filled.zone_name(latitude, longitude) == lazy.zone_name(latitude, longitude)
+
+
+def test_build_grid_rasterizes_polygons(tmp_path):
+    square = ([0.0, 20.0, 20.0, 0.0], [40.0, 40.0, 60.0, 60.0])
+    hole = ([5.0, 5.0, 10.0, 10.0], [45.0, 50.0, 50.0, 45.0])
+    # Overlaps the square; the smaller zone wins
+    enclave = ([12.0, 16.0, 16.0, 12.0], [52.0, 52.0, 56.0, 56.0])
+    resolver = build_grid([("Europe/Paris", [square, hole]), ("Europe/Berlin", [enclave])],
+                          resolution=2.0, tile_size=8)
+    path = tmp_path / "grid.bin"
+    resolver.save(path)
+    loaded = TimezoneResolver(grid_path=path)
+
+    for grid in (resolver, loaded):
+        assert grid.zone_name(41.0, 1.0) == "Europe/Paris"
+        assert grid.zone_name(58.0, 19.0) == "Europe/Paris"
+        assert grid.zone_name(52.2, 12.2) == "Europe/Berlin"
+        assert grid.zone_name(55.9, 15.9) == "Europe/Berlin"
+        assert grid.zone_name(51.9, 12.2) == "Europe/Paris"
+        assert grid.zone_name(47.5, 7.5) != "Europe/Paris"
+        # Open sea far from every reference location
+        assert grid.zone_name(-40.0, -130.0) == "Etc/GMT+9"
+
+
+@pytest.mark.parametrize("latitude, longitude, zone_name", [
+    (-8.65, 115.22, "Asia/Makassar"),                  # Denpasar
+    (-8.58, 116.12, "Asia/Makassar"),                  # Mataram
+    (18.79, 98.98, "Asia/Bangkok"),                    # Chiang Mai
+    (35.05, -85.31, "America/New_York"),               # Chattanooga
+    (41.68, -86.25, "America/Indiana/Indianapolis"),   # South Bend
+    (37.97, -87.57, "America/Chicago"),                # Evansville
+    (44.08, -103.23, "America/Denver"),                # Rapid City
+    (-20.73, 139.49, "Australia/Brisbane"),            # Mount Isa
+    (52.10, 23.69, "Europe/Minsk"),                    # Brest, Belarus
+    (59.38, 28.19, "Europe/Tallinn"),                  # Narva
+    (59.37, 28.22, "Europe/Moscow"),                   # Ivangorod
+    (31.76, -106.49, "America/Denver"),                # El Paso
+    (31.69, -106.42, "America/Ciudad_Juarez"),         # Ciudad Juarez
+    (47.56, 7.59, "Europe/Zurich"),                    # Basel
+    (48.57, 7.75, "Europe/Paris"),                     # Strasbourg
+    (23.83, 91.28, "Asia/Kolkata"),                    # Agartala
+    (25.57, 91.88, "Asia/Kolkata"),                    # Shillong
+    (23.81, 90.41, "Asia/Dhaka"),                      # Dhaka
+    (24.90, 91.87, "Asia/Dhaka"),                      # Sylhet
+    (23.96, 91.11, "Asia/Dhaka"),                      # Brahmanbaria
+    (21.97, 96.08, "Asia/Yangon"),                     # Mandalay
+    (27.47, 89.64, "Asia/Thimphu"),                    # Thimphu
+    (43.83, 87.62, "Asia/Urumqi"),                     # Urumqi
+    (-17.80, 177.42, "Pacific/Fiji"),                  # Nadi
+    (-50.0, -120.0, "Etc/GMT+8"),                      # South Pacific
+])
+def test_places(bundled, latitude, longitude, zone_name):
+    assert bundled.zone_name(latitude, longitude) == zone_name
@@ -0,0 +1,50 @@
+"""Bad /api/transits parameters must be a 400 up front, never a broken stream."""
+
+import json
+
+import pytest
+
+import app as app_module
+
+QUERY = {"start": "2024-01-01T00:00", "end": "2024-01-03T00:00", "step": "1d",
+         "latitude": "28.61", "longitude": "77.21"}
+
+
+@pytest.fixture
+def client():
+    return app_module.app.test_client()
+
+
+def rows(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_streams_every_step(client):
+    response = client.get("/api/transits", query_string=QUERY)
+    assert response.status_code == 200
+    assert [row["time"] for row in rows(response)] == [
+        "2024-01-01T00:00:00", "2024-01-02T00:00:00", "2024-01-03T00:00:00"]
+
+
+@pytest.mark.parametrize("query", [
+    dict(QUERY, step="999999999d"),
+    dict(QUERY, start="9999-12-30T00:00", end="9999-12-31T23:00"),
+])
+def test_step_past_calendar_end_finishes_stream(client, query):
+    response = client.get("/api/transits", query_string=query)
+    assert response.status_code == 200
+    assert all("positions" in row for row in rows(response))
+
+
+@pytest.mark.parametrize("changes", [
+    {"latitude": "nan"},
+    {"longitude": "inf"},
+    {"max_steps": "-1"},
+    {"max_steps": "0"},
+    {"max_steps": "2"},
+    {"step": "99999999999d"},
+])
+def test_rejects_bad_parameters(client, changes):
+    response = client.get("/api/transits", query_string=dict(QUERY, **changes))
+    assert response.status_code == 400
+    assert response.get_json()["error"]
@@ -0,0 +1,460 @@
+"""Offline timezone resolution from latitude/longitude.
+
+The world is divided into a grid of cells, each storing a zone index. The
+bundled ``timezone_grid.bin`` is rasterized from the timezone-boundary-builder
+zone polygons: a cell inside one zone stores that zone, and a cell crossed by
+a zone border points to a tile of ``tile_size`` x ``tile_size`` sub-cells
+(about 1.7 km at the default 0.25 degrees and 16). Where polygons overlap, the
+smaller zone wins, as in the tz database's own lookups. Building the grid
+needs the polygons shipped with ``timezonefinder``, which serving does not:
+
+    pip install timezonefinder
+    python timezone_resolver.py generate -o timezone_grid.bin
+
+Cells with no land fall back to the zone with the nearest reference location,
+taken from pytz's ``zone.tab`` plus the points in ``timezone_points.tsv``, or
+to the nautical ``Etc/GMT`` zone for their longitude when every reference
+location is farther than ``MAX_LAND_DISTANCE_KM``. Without a grid file every
+cell is resolved that way, lazily on first use, which is only approximate near
+borders; callers can pass an explicit zone instead.
+
+A lookup is one index computation and one or two array reads.
+
+Local times are converted with pytz, so historical DST and offset changes are
+applied. Offsets are cached per (zone, local time).
+"""
+
+import argparse
+import math
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from functools import lru_cache
+
+import numpy as np
+import pytz
+
+POINTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "timezone_points.tsv")
+GRID_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "timezone_grid.bin")
+
+MAGIC = b"ASTZONE2"
+# magic, resolution (degrees), rows, columns, tile size, tile count,
+# zone count, zone names length, source description length
+HEADER = struct.Struct("<8sdIIIIIII")
+
+UNRESOLVED = 0xFFFF
+# Cell values from here up (below UNRESOLVED) index a tile of sub-cells
+TILE_FLAG = 0x8000
+# Zones newer than the pinned pytz, mapped to the zone they split from
+ZONE_ALIASES = {"America/Coyhaique": "America/Santiago"}
+EARTH_RADIUS_KM = 6371.0
+# Farther than this from every reference location counts as open sea
+MAX_LAND_DISTANCE_KM = 1500.0
+
+
+def load_zone_locations(points_path=POINTS_PATH):
+    """(zone name, latitude, longitude) for every reference location"""
+    with pytz.open_resource("zone.tab") as zone_tab:
+        lines = zone_tab.read().decode("utf-8").splitlines()
+    zones = []
+    for line in lines:
+        if not line or line.startswith("#"):
+            continue
+        _, coordinates, name = line.split("\t")[:3]
+        if name in pytz.all_timezones_set:
+            latitude, longitude = _parse_iso6709(coordinates)
+            zones.append((name, latitude, longitude))
+
+    if points_path and os.path.exists(points_path):
+        with open(points_path, encoding="utf-8") as points_file:
+            for line in points_file:
+                if not line.strip() or line.startswith("#"):
+                    continue
+                name, latitude, longitude = line.split("\t")[:3]
+                if name in pytz.all_timezones_set:
+                    zones.append((name, float(latitude), float(longitude)))
+    return zones
+
+
+def _parse_iso6709(value):
+    """Parse zone.tab's +DDMM[SS]+DDDMM[SS] coordinates into degrees"""
+    split = max(value.rfind("+"), value.rfind("-"))
+    return _parse_degrees(value[:split], 2), _parse_degrees(value[split:], 3)
+
+
+def _parse_degrees(value, degree_digits):
+    sign = -1 if value[0] == "-" else 1
+    digits = value[1:]
+    degrees = int(digits[:degree_digits])
+    minutes = int(digits[degree_digits:degree_digits + 2])
+    seconds = int(digits[degree_digits + 2:] or 0)
+    return sign * (degrees + minutes / 60 + seconds / 3600)
+
+
+def nautical_zone(longitude):
+    """Etc/GMT zone of the 15-degree nautical band containing ``longitude``"""
+    hours = int(math.floor((longitude + 7.5) / 15))
+    hours = max(-12, min(12, hours))
+    if hours == 0:
+        return "Etc/GMT"
+    # Etc/GMT signs are inverted: Etc/GMT-5 is five hours ahead of UTC
+    return f"Etc/GMT{-hours:+d}"
+
+
+def _unit_vector(latitude, longitude):
+    lat = math.radians(latitude)
+    lon = math.radians(longitude)
+    return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+
+@lru_cache(maxsize=65536)
+def utc_offset(zone_name, local_datetime):
+    """UTC offset of a naive local time in a zone, following historical DST rules"""
+    # Ambiguous and skipped times at DST changes resolve to standard time
+    return pytz.timezone(zone_name).localize(local_datetime, is_dst=False).utcoffset()
+
+
+def to_utc(local_datetime, zone_name):
+    """Convert a naive local datetime in ``zone_name`` to naive UTC"""
+    return local_datetime - utc_offset(zone_name, local_datetime)
+
+
+def format_offset(offset):
+    """Format a timedelta offset as +HH:MM"""
+    minutes = int(offset.total_seconds() // 60)
+    sign = "-" if minutes < 0 else "+"
+    hours, minutes = divmod(abs(minutes), 60)
+    return f"{sign}{hours:02d}:{minutes:02d}"
+
+
+class TimezoneResolver:
+    """Maps coordinates to tz database zone names through a grid of cells"""
+
+    def __init__(self, resolution=0.25, grid_path=None, extra_zones=()):
+        if grid_path:
+            self._load(grid_path)
+        else:
+            self.resolution = resolution
+            self.rows = int(round(180 / resolution))
+            self.columns = int(round(360 / resolution))
+            self.zone_names = self._default_zone_names(extra_zones)
+            self.cells = array("H", [UNRESOLVED]) * (self.rows * self.columns)
+            self.tile_size = 0
+            self.tiles = array("H")
+            self.source = "nearest reference location"
+
+        self._zone_index = {name: index for index, name in enumerate(self.zone_names)}
+        self._zone_vectors = [(self._zone_index[name], _unit_vector(latitude, longitude))
+                              for name, latitude, longitude in load_zone_locations()
+                              if name in self._zone_index]
+        self._min_dot = math.cos(MAX_LAND_DISTANCE_KM / EARTH_RADIUS_KM)
+
+    def zone_name(self, latitude, longitude):
+        """Name of the timezone in effect at the given coordinates"""
+        row, column = self._cell(latitude, longitude)
+        cell = row * self.columns + column
+        index = self.cells[cell]
+        if index == UNRESOLVED:
+            # Concurrent fills of the same cell compute the same value, so no lock
+            index = self.cells[cell] = self._nearest_zone(*self._cell_center(row, column))
+        elif index >= TILE_FLAG:
+            tile = index - TILE_FLAG
+            index = self.tiles[self._tile_offset(tile, row, column, latitude, longitude)]
+        return self.zone_names[index]
+
+    def resolve(self, local_datetime, latitude, longitude):
+        """(zone name, naive UTC datetime) for a local time at the given coordinates"""
+        zone_name = self.zone_name(latitude, longitude)
+        return zone_name, to_utc(local_datetime, zone_name)
+
+    def fill(self, progress=None):
+        """Resolve every cell of the grid, a row of cells at a time"""
+        zone_indexes = np.array([index for index, _ in self._zone_vectors], dtype=np.intp)
+        zone_vectors = np.array([vector for _, vector in self._zone_vectors], dtype=np.float64)
+        longitudes = [self._cell_center(0, column)[1] for column in range(self.columns)]
+        nautical = np.array([self._zone_index[nautical_zone(longitude)]
+                             for longitude in longitudes], dtype=np.intp)
+        radians = np.radians(np.array(longitudes))
+        cells = np.frombuffer(self.cells, dtype=np.uint16)
+        columns = np.arange(self.columns)
+
+        for row in range(self.rows):
+            latitude = math.radians(self._cell_center(row, 0)[0])
+            centers = np.stack([math.cos(latitude) * np.cos(radians),
+                                math.cos(latitude) * np.sin(radians),
+                                np.full(self.columns, math.sin(latitude))], axis=1)
+            # Same rule as _nearest_zone: the largest dot product wins, first on ties
+            dots = centers @ zone_vectors.T
+            best = dots.argmax(axis=1)
+            resolved = np.where(dots[columns, best] < self._min_dot, nautical, zone_indexes[best])
+            row_cells = cells[row * self.columns:(row + 1) * self.columns]
+            row_cells[:] = np.where(row_cells == UNRESOLVED, resolved, row_cells)
+            if progress:
+                progress(row + 1, self.rows)
+
+    def save(self, path):
+        """Write the grid, its tiles and the zone list to ``path``"""
+        names = "\n".join(self.zone_names).encode("utf-8")
+        source = self.source.encode("utf-8")
+        tile_count = len(self.tiles) // (self.tile_size ** 2) if self.tile_size else 0
+        with open(path, "wb") as out:
+            out.write(HEADER.pack(MAGIC, self.resolution, self.rows, self.columns, self.tile_size,
+                                  tile_count, len(self.zone_names), len(names), len(source)))
+            out.write(names)
+            out.write(source)
+            # Runs of equal cells compress well: the bundled grid shrinks about thirtyfold
+            out.write(zlib.compress(self.cells.tobytes() + self.tiles.tobytes(), 9))
+
+    def _load(self, path):
+        with open(path, "rb") as grid_file:
+            header = grid_file.read(HEADER.size)
+            if len(header) != HEADER.size or header[:8] != MAGIC:
+                raise ValueError(f"{path} is not a timezone grid file")
+            (_, resolution, rows, columns, tile_size, tile_count, zone_count, names_length,
+             source_length) = HEADER.unpack(header)
+            self.resolution = resolution
+            self.rows = rows
+            self.columns = columns
+            self.tile_size = tile_size
+            self.zone_names = grid_file.read(names_length).decode("utf-8").split("\n")
+            if len(self.zone_names) != zone_count:
+                raise ValueError(f"{path} has a corrupt zone list")
+            self.source = grid_file.read(source_length).decode("utf-8")
+            data = zlib.decompress(grid_file.read())
+        cells_size = rows * columns * 2
+        if len(data) != cells_size + tile_count * tile_size * tile_size * 2:
+            raise ValueError(f"{path} has a corrupt grid")
+        self.cells = array("H")
+        self.cells.frombytes(data[:cells_size])
+        self.tiles = array("H")
+        self.tiles.frombytes(data[cells_size:])
+
+    def _default_zone_names(self, extra_zones=()):
+        names = sorted({name for name, _, _ in load_zone_locations()} | set(extra_zones))
+        names.extend(sorted({nautical_zone(longitude) for longitude in range(-180, 181)}))
+        return names
+
+    def _cell(self, latitude, longitude):
+        row = min(self.rows - 1, max(0, int((latitude + 90) / self.resolution)))
+        column = int((longitude + 180) / self.resolution) % self.columns
+        return row, column
+
+    def _tile_offset(self, tile, row, column, latitude, longitude):
+        # Position of the sub-cell within its cell, clamped against rounding
+        size = self.tile_size
+        sub_row = int(((latitude + 90) / self.resolution - row) * size)
+        sub_column = int((((longitude + 180) / self.resolution) % self.columns - column) * size)
+        sub_row = min(size - 1, max(0, sub_row))
+        sub_column = min(size - 1, max(0, sub_column))
+        return (tile * size + sub_row) * size + sub_column
+
+    def _cell_center(self, row, column):
+        return ((row + 0.5) * self.resolution - 90, (column + 0.5) * self.resolution - 180)
+
+    def _nearest_zone(self, latitude, longitude):
+        x, y, z = _unit_vector(latitude, longitude)
+        best_index = None
+        best_dot = -2.0
+        # The largest dot product of unit vectors is the smallest great-circle distance
+        for index, (zx, zy, zz) in self._zone_vectors:
+            dot = x * zx + y * zy + z * zz
+            if dot > best_dot:
+                best_index, best_dot = index, dot
+        if best_dot < self._min_dot:
+            return self._zone_index[nautical_zone(longitude)]
+        return best_index
+
+
+def load_boundaries():
+    """(zone name, rings) for every land zone in timezonefinder's boundary data
+
+    Each ring is a (longitudes, latitudes) pair; a zone's outer rings and holes
+    are listed together, so even-odd filling yields its area. Ocean ``Etc``
+    zones are skipped: open sea uses the nearest-location fallback.
+    """
+    try:
+        import timezonefinder
+    except ImportError:
+        raise ImportError("Building the grid needs the zone polygons shipped with timezonefinder: "
+                          "pip install timezonefinder") from None
+    finder = timezonefinder.TimezoneFinder()
+    boundaries = []
+    for zone in finder.timezone_names:
+        if zone.startswith("Etc/"):
+            continue
+        name = zone
+        if name not in pytz.all_timezones_set:
+            if name not in ZONE_ALIASES:
+                raise ValueError(f"Zone {name} is unknown to pytz {pytz.__version__}; "
+                                 f"add it to ZONE_ALIASES or upgrade pytz")
+            name = ZONE_ALIASES[name]
+        rings = [ring for polygon in finder.get_geometry(tz_name=zone, coords_as_pairs=False)
+                 for ring in polygon]
+        boundaries.append((name, rings))
+    source = (f"timezonefinder {getattr(timezonefinder, '__version__', '?')}, "
+              f"boundaries {getattr(finder, 'data_version', '?')}")
+    return boundaries, source
+
+
+def build_grid(boundaries, resolution=0.25, tile_size=16, source="", progress=None):
+    """Resolver whose land cells are rasterized from zone boundary polygons
+
+    Each sub-cell takes the zone containing its centre; where zones overlap,
+    the one with the smaller area wins. A cell covered by one zone (and
+    perhaps sea) stores it directly, a cell with several zones gets a tile,
+    and sea within a tile takes the tile's most common zone. Cells without
+    land are resolved from the nearest reference location.
+    """
+    resolver = TimezoneResolver(resolution=resolution, extra_zones={name for name, _ in boundaries})
+    step = resolution / tile_size
+    # 0 marks sea, zone indexes are stored plus one
+    raster = np.zeros((resolver.rows * tile_size, resolver.columns * tile_size), dtype=np.uint16)
+    for name, rings in sorted(boundaries, key=lambda boundary: -_zone_area(boundary[1])):
+        _rasterize(raster, rings, resolver._zone_index[name] + 1, step)
+
+    cells = np.frombuffer(resolver.cells, dtype=np.uint16)
+    tiles = []
+    for row in range(resolver.rows):
+        block = raster[row * tile_size:(row + 1) * tile_size].reshape(
+            tile_size, resolver.columns, tile_size).transpose(1, 0, 2).reshape(resolver.columns, -1)
+        highest = block.max(axis=1)
+        lowest = np.where(block == 0, UNRESOLVED, block).min(axis=1)
+        row_cells = cells[row * resolver.columns:(row + 1) * resolver.columns]
+        single = (highest > 0) & (lowest == highest)
+        row_cells[single] = highest[single] - 1
+        for column in np.nonzero((highest > 0) & (lowest != highest))[0]:
+            tile = block[column]
+            most_common = np.bincount(tile[tile > 0]).argmax()
+            row_cells[column] = TILE_FLAG + len(tiles)
+            tiles.append(np.where(tile == 0, most_common, tile) - 1)
+        if progress:
+            progress(row + 1, resolver.rows)
+    if TILE_FLAG + len(tiles) >= UNRESOLVED:
+        raise ValueError(f"{len(tiles)} border tiles do not fit the grid format; "
+                         f"use a smaller tile size")
+
+    resolver.tile_size = tile_size
+    resolver.tiles = array("H")
+    if tiles:
+        resolver.tiles.frombytes(np.concatenate(tiles).astype(np.uint16).tobytes())
+    resolver.source = source
+    resolver.fill()
+    return resolver
+
+
+def _zone_area(rings):
+    # Planar area in square degrees, enough to order overlapping zones
+    total = 0.0
+    for longitudes, latitudes in rings:
+        x = np.asarray(longitudes, dtype=np.float64)
+        y = np.asarray(latitudes, dtype=np.float64)
+        total += abs(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1))) / 2
+    return total
+
+
+def _rasterize(raster, rings, value, step):
+    """Set every cell of ``raster`` whose centre lies inside ``rings`` to ``value``"""
+    rows, columns = raster.shape
+    rings = [(np.asarray(longitudes, dtype=np.float64), np.asarray(latitudes, dtype=np.float64))
+             for longitudes, latitudes in rings]
+    x0 = np.concatenate([longitudes for longitudes, _ in rings])
+    y0 = np.concatenate([latitudes for _, latitudes in rings])
+    # Each ring's edges run from every vertex to the next, closing the ring
+    x1 = np.concatenate([np.roll(longitudes, -1) for longitudes, _ in rings])
+    y1 = np.concatenate([np.roll(latitudes, -1) for _, latitudes in rings])
+
+    # An edge crosses the row of cell centres at y when min(y0, y1) <= y < max(y0, y1)
+    first_row = np.clip(np.ceil((np.minimum(y0, y1) + 90) / step - 0.5), 0, rows).astype(np.int64)
+    end_row = np.clip(np.ceil((np.maximum(y0, y1) + 90) / step - 0.5), 0, rows).astype(np.int64)
+    crossings = end_row - first_row
+    keep = crossings > 0
+    if not keep.any():
+        return
+    x0, y0, x1, y1 = x0[keep], y0[keep], x1[keep], y1[keep]
+    first_row, crossings = first_row[keep], crossings[keep]
+
+    edge = np.repeat(np.arange(len(crossings)), crossings)
+    # Row of each crossing: the edge's first row plus the crossing's position along the edge
+    starts = np.repeat(np.cumsum(crossings) - crossings, crossings)
+    row = first_row[edge] + np.arange(crossings.sum()) - starts
+    y = (row + 0.5) * step - 90
+    x = x0[edge] + (y - y0[edge]) * (x1[edge] - x0[edge]) / (y1[edge] - y0[edge])
+    # Cells whose centres lie east of a crossing flip between outside and inside
+    column = np.clip(np.ceil((x + 180) / step - 0.5), 0, columns).astype(np.int64)
+
+    top, bottom = row.min(), row.max() + 1
+    left, right = column.min(), column.max()
+    flips = np.zeros((bottom - top, right - left + 1), dtype=np.uint8)
+    np.add.at(flips, (row - top, column - left), 1)
+    # uint8 wrap-around keeps the parity
+    inside = (np.cumsum(flips, axis=1, dtype=np.uint8)[:, :-1] & 1).astype(bool)
+    raster[top:bottom, left:right][inside] = value
+
+
+def create_timezone_resolver():
+    """Resolver configured from TIMEZONE_RESOLUTION / TIMEZONE_GRID, or None when disabled
+
+    Without TIMEZONE_GRID the bundled grid is loaded, or, if it is missing,
+    cells are resolved lazily.
+    """
+    if os.getenv("TIMEZONE_RESOLUTION", "True") != "True":
+        return None
+    grid_path = os.getenv("TIMEZONE_GRID") or None
+    if grid_path is None and os.path.exists(GRID_PATH):
+        grid_path = GRID_PATH
+    return TimezoneResolver(grid_path=grid_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query the offline timezone grid")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate_parser = commands.add_parser("generate",
+                                          help="Rasterize the zone boundaries and save the grid")
+    generate_parser.add_argument("-o", "--output", required=True, help="Output file path")
+    generate_parser.add_argument("--resolution", type=float, default=0.25,
+                                 help="Cell size in degrees")
+    generate_parser.add_argument("--tile-size", type=int, default=16,
+                                 help="Sub-cells per side in cells crossed by a border")
+
+    lookup_parser = commands.add_parser("lookup", help="Resolve the zone for coordinates")
+    lookup_parser.add_argument("latitude", type=float)
+    lookup_parser.add_argument("longitude", type=float)
+    lookup_parser.add_argument("--grid", default=GRID_PATH if os.path.exists(GRID_PATH) else None,
+                               help="Grid file path (default: the bundled grid)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        def progress(done, total):
+            sys.stderr.write(f"\r{done}/{total} rows ({done * 100 // total}%)")
+            sys.stderr.flush()
+
+        began = time.perf_counter()
+        try:
+            boundaries, source = load_boundaries()
+        except (ImportError, ValueError) as error:
+            sys.stderr.write(f"{error}\n")
+            return 1
+        resolver = build_grid(boundaries, resolution=args.resolution, tile_size=args.tile_size,
+                              source=source, progress=progress)
+        resolver.save(args.output)
+        sys.stderr.write("\n")
+        size = os.path.getsize(args.output)
+        tile_count = len(resolver.tiles) // (resolver.tile_size ** 2)
+        print(f"Wrote {resolver.rows}x{resolver.columns} cells and {tile_count} border tiles "
+              f"from {source} ({size / 1e6:.1f} MB) to {args.output} "
+              f"in {time.perf_counter() - began:.1f}s")
+        return 0
+
+    resolver = TimezoneResolver(grid_path=args.grid)
+    zone_name = resolver.zone_name(args.latitude, args.longitude)
+    print(zone_name)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())